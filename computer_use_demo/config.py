@@ -32,6 +32,12 @@ class EditConfig:
     """Edit工具配置"""
     SNIPPET_LINES: int = 4  # 显示编辑上下文的行数
 
+@dataclass
+class BrowserConfig:
+    """Browser工具配置"""
+    DISABLE_IMAGES: bool = False  # 不加载网页图片以加快页面加载，截图中将不显示图片
+    SCREENSHOT_QUALITY: int = 80  # 网页截图的JPEG质量(1-100)
+
 @dataclass
 class PathConfig:
     """路径相关配置"""
@@ -45,6 +51,7 @@ class APIConfig:
     """API相关配置"""
     MAX_TOKENS: int = 4096
     REQUEST_TIMEOUT: float = 60.0
+    MAX_HISTORY_TURNS: int = 10  # 发送给API的最近用户输入轮数，小于等于0时发送全部历史
 
 class Config:
     """全局配置单例类"""
@@ -56,6 +63,7 @@ class Config:
             # 初始化各工具的配置
             cls._instance.computer = ComputerConfig()
             cls._instance.edit = EditConfig()
+            cls._instance.browser = BrowserConfig()
             cls._instance.path = PathConfig()
             cls._instance.api = APIConfig()
         return cls._instance
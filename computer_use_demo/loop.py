@@ -1,17 +1,18 @@
 """代理采样循环模块"""
 
+import hashlib
 import json
 import platform
 from collections.abc import Callable
 from dataclasses import dataclass
 from datetime import datetime
 from enum import StrEnum
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 
 import httpx
 
 from .config import Config
-from .tools import ComputerTool, CommandTool, EditTool, BrowserTool, ToolCollection, ToolResult
+from .tools import CommandTool, EditTool, ToolCollection, ToolResult
 
 class APIProvider(StrEnum):
     """API提供者类型"""
@@ -56,6 +57,7 @@ async def sampling_loop(
     callback_config: CallbackConfig,
     messages: List[Dict[str, Any]],
     system_prompt_suffix: str = "",
+    image_store: Optional[Dict[str, str]] = None,
 ) -> List[Dict[str, Any]]:
     """
     代理采样循环，用于助手/工具交互。
@@ -65,10 +67,14 @@ async def sampling_loop(
         callback_config: 回调函数配置
         messages: 消息历史
         system_prompt_suffix: 系统提示后缀
+        image_store: 图片存储（摘要 -> 图片数据URL）。提供时消息历史中只保存图片引用
         
     Returns:
         更新后的消息历史
     """
+    # 依赖较重的工具在首次运行时才导入
+    from .tools import BrowserTool, ComputerTool
+
     config = Config.get_instance()
     
     # 初始化工具集合
@@ -85,29 +91,30 @@ async def sampling_loop(
         "text": f"{SYSTEM_PROMPT}{' ' + system_prompt_suffix if system_prompt_suffix else ''}",
     }
 
-    while True:
-        # 根据提供者选择客户端
-        if api_config.provider == APIProvider.OPENROUTER:
-            from .openrouter_client import OpenrouterClient
-            client = await OpenrouterClient(
-                base_url=api_config.base_url,
-                api_key=api_config.api_key,
-                model=api_config.model
-            ).initialize()
+    # 根据提供者选择客户端，整个循环复用同一个客户端
+    if api_config.provider == APIProvider.OPENROUTER:
+        from .openrouter_client import OpenrouterClient
+        client = await OpenrouterClient(
+            base_url=api_config.base_url,
+            api_key=api_config.api_key,
+            model=api_config.model
+        ).initialize()
 
-        # 从配置获取并过滤最近图片
-        if config.computer.ONLY_N_MOST_RECENT_IMAGES:
-            messages = _filter_recent_images(
-                messages,
-                config.computer.ONLY_N_MOST_RECENT_IMAGES,
-            )
+    while True:
+        # 从配置获取并过滤最近图片，同时展开图片引用
+        request_messages = _filter_recent_images(
+            messages,
+            config.computer.ONLY_N_MOST_RECENT_IMAGES,
+            image_store,
+        )
 
         try:
             # 调用API
             raw_response, message = await client.beta.messages.create(
                 max_tokens=config.api.MAX_TOKENS,
-                messages=messages,
+                messages=request_messages,
                 system=[system],
+                history=messages,
             )
         except Exception as e:
             callback_config.api_response(getattr(e, 'response', None), e)
@@ -152,49 +159,98 @@ async def sampling_loop(
                 "tool_call_id": item["tool_use_id"],
                 "content": json.dumps([item["tool_result"]])
             })
+        content = tool_results[-1]["content"]
+        if image_store is not None:
+            content = _intern_images(content, image_store)
         messages.append({
             "role": "user",
-            "content": tool_results[-1]["content"]
+            "content": content
         })
 
 
+def _intern_images(
+    content: List[Dict[str, Any]],
+    image_store: Dict[str, str],
+) -> List[Dict[str, Any]]:
+    """
+    将内容中的图片数据存入图片存储，并替换为图片引用。
+    
+    Args:
+        content: 消息内容块列表
+        image_store: 图片存储
+        
+    Returns:
+        图片被替换为引用后的内容块列表
+    """
+    new_content = []
+    for block in content:
+        if isinstance(block, dict) and block.get("type") == "image_url":
+            url = block["image_url"]["url"]
+            image_hash = hashlib.sha1(url.encode()).hexdigest()
+            image_store.setdefault(image_hash, url)
+            new_content.append({"type": "image_ref", "hash": image_hash})
+        else:
+            new_content.append(block)
+    return new_content
+
+
 def _filter_recent_images(
     messages: List[Dict[str, Any]],
     images_to_keep: int,
+    image_store: Optional[Dict[str, str]] = None,
 ) -> List[Dict[str, Any]]:
     """
-    过滤消息以仅保留最近的图片。
+    过滤消息以仅保留最近的图片，并将图片引用展开为图片数据。
+    
+    不修改传入的消息历史，返回用于API请求的新消息列表。
     
     Args:
         messages: 消息列表
-        images_to_keep: 要保留的图片数量
+        images_to_keep: 要保留的图片数量，小于等于0时保留全部图片
+        image_store: 图片存储，不再被保留的图片会从中移除
         
     Returns:
         过滤后的消息列表
     """
-    if images_to_keep <= 0:
-        return messages
-        
     # 从最新到最旧追踪图片数量
     images_seen = 0
+    kept_hashes = set()
     
     # 反向处理消息以保留最近的图片
     new_messages = []
     for message in reversed(messages):
-        new_content = []
-        if isinstance(message.get("content"), list):
-            for content in message["content"]:
-                if isinstance(content, dict) and content.get("type") == "image_url":
-                    if images_seen < images_to_keep:
-                        images_seen += 1
-                        new_content.append(content)
-                else:
-                    new_content.append(content)
-            if new_content:
-                message["content"] = new_content
-                new_messages.append(message)
-        else:
+        if not isinstance(message.get("content"), list):
             new_messages.append(message)
+            continue
+            
+        new_content = []
+        changed = False
+        for content in message["content"]:
+            content_type = content.get("type") if isinstance(content, dict) else None
+            if content_type not in ("image_url", "image_ref"):
+                new_content.append(content)
+                continue
+            if 0 < images_to_keep <= images_seen:
+                changed = True
+                continue
+            if content_type == "image_ref":
+                changed = True
+                url = image_store.get(content["hash"]) if image_store is not None else None
+                if url is None:
+                    continue
+                kept_hashes.add(content["hash"])
+                content = {"type": "image_url", "image_url": {"url": url}}
+            images_seen += 1
+            new_content.append(content)
+        if not new_content:
+            continue
+        # 内容未变化的消息直接复用，保持对象标识不变
+        new_messages.append({**message, "content": new_content} if changed else message)
+    
+    # 释放不再发送的图片
+    if image_store is not None:
+        for image_hash in image_store.keys() - kept_hashes:
+            del image_store[image_hash]
     
     return list(reversed(new_messages))
 
@@ -223,6 +279,12 @@ def _response_to_params(
     return result
 
 
+def _image_media_type(base64_image: str) -> str:
+    """根据base64数据开头的文件签名判断图片格式，工具截图为PNG或JPEG"""
+    # JPEG文件以FF D8 FF开头，base64编码后为"/9j/"
+    return "image/jpeg" if base64_image.startswith("/9j/") else "image/png"
+
+
 def _make_tool_result(
     result: ToolResult,
     tool_name: str,
@@ -288,7 +350,7 @@ def _make_tool_result(
                 {
                     "type": "image_url",
                     "image_url": {
-                        "url": f"data:image/png;base64,{result.base64_image}",
+                        "url": f"data:{_image_media_type(result.base64_image)};base64,{result.base64_image}",
                     },
                 }
             ])
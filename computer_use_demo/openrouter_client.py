@@ -10,6 +10,9 @@ from .config import Config
 from .tools.exceptions import APIError
 from .tools.base import ToolFactory
 
+# 允许的消息角色
+_VALID_ROLES = frozenset(("user", "assistant", "system", "tool"))
+
 class OpenrouterResponse:
     """OpenRouter API响应包装器"""
     
@@ -77,6 +80,9 @@ class OpenrouterClient:
             def __init__(self, client: 'OpenrouterClient'):
                 self.client = client
                 self.logger = logging.getLogger(self.__class__.__name__)
+                # 已验证的消息数量及最后一条已验证消息，用于跳过重复验证
+                self._validated_len = 0
+                self._validated_tail: Optional[Dict[str, Any]] = None
                 
             def with_raw_response(self) -> 'OpenrouterClient.Beta.Messages':
                 """方法链式调用"""
@@ -87,6 +93,7 @@ class OpenrouterClient:
                 max_tokens: int,
                 messages: List[Dict[str, Any]],
                 system: List[Dict[str, Any]],
+                history: Optional[List[Dict[str, Any]]] = None,
             ) -> Tuple[OpenrouterResponse, Dict[str, Any]]:
                 """
                 创建聊天完成。
@@ -95,6 +102,11 @@ class OpenrouterClient:
                     max_tokens: 最大生成令牌数
                     messages: 聊天历史
                     system: 系统消息
+                    history: 生成messages的持久化消息历史。messages每轮都会重新构建，
+                        提供时改为验证history，使已验证的消息前缀在多轮之间保持可识别。
+                        messages必须由history派生: 只替换消息的content列表或省略消息，
+                        不改变角色也不加入新消息(与loop._filter_recent_images相同)，
+                        因此history通过验证时messages也满足同样的格式要求
                     
                 Returns:
                     OpenrouterResponse和解析后的消息
@@ -107,11 +119,8 @@ class OpenrouterClient:
                 if not messages or not isinstance(messages, list):
                     raise ValueError("messages必须是非空列表")
                 
-                for msg in messages:
-                    if not isinstance(msg, dict) or "role" not in msg or "content" not in msg:
-                        raise ValueError("每条消息必须是包含'role'和'content'键的字典")
-                    if msg["role"] not in ["user", "assistant", "system", "tool"]:
-                        raise ValueError(f"无效的消息角色: {msg['role']}")
+                # 提供history时messages中的消息都来自history，验证history即可
+                self._validate_messages(history if history is not None else messages)
                 
                 if not self.client.model:
                     raise ValueError("需要提供模型名称")
@@ -155,7 +164,8 @@ class OpenrouterClient:
                     try:
                         # 解析OpenRouter响应
                         openrouter_response = http_response.json()
-                        self.logger.debug(f"OpenRouter响应: {openrouter_response}")
+                        if self.logger.isEnabledFor(logging.DEBUG):
+                            self.logger.debug("OpenRouter响应: %s", openrouter_response)
                     except ValueError as e:
                         raise ValueError(f"无效的JSON响应: {e}")
                 
@@ -223,20 +233,25 @@ class OpenrouterClient:
                 message = _create_message(openrouter_response, choice, request_id)
                 return OpenrouterResponse(message, http_response), choice["message"]
 
+            def _validate_messages(self, messages: List[Dict[str, Any]]) -> None:
+                """验证消息格式，已验证过的消息前缀不再重复检查"""
+                start = 0
+                validated_len = self._validated_len
+                if 0 < validated_len <= len(messages) and messages[validated_len - 1] is self._validated_tail:
+                    if validated_len == len(messages):
+                        return
+                    start = validated_len
+
+                for msg in messages[start:]:
+                    if not isinstance(msg, dict) or "role" not in msg or "content" not in msg:
+                        raise ValueError("每条消息必须是包含'role'和'content'键的字典")
+                    if msg["role"] not in _VALID_ROLES:
+                        raise ValueError(f"无效的消息角色: {msg['role']}")
+
+                self._validated_len = len(messages)
+                self._validated_tail = messages[-1]
+
             def _get_tool_definitions(self) -> List[Dict[str, Any]]:
                 """获取工具定义"""
-                tool_definitions = []
-                for tool_name in ToolFactory._tools:
-                    tool = ToolFactory.create(tool_name)
-                    # 从工具类中获取参数定义
-                    if hasattr(tool, "parameters_schema"):
-                        tool_def = {
-                            "type": "function",
-                            "function": {
-                                "name": tool.name,
-                                "description": tool.__class__.__doc__.strip(),
-                                "parameters": tool.parameters_schema
-                            }
-                        }
-                        tool_definitions.append(tool_def)
-                return tool_definitions
+                tool_definitions = [ToolFactory.describe(tool_name) for tool_name in ToolFactory._tools]
+                return [tool_def for tool_def in tool_definitions if tool_def is not None]
@@ -1,13 +1,17 @@
 """Streamlit Web界面模块"""
 
+import asyncio
 import base64
 import os
+import time
+from dataclasses import dataclass, field
 from enum import Enum
-from typing import Any, Dict, Optional, Union
+from typing import Any, Dict, List, Optional, Union
 
+import httpx
+import orjson
 import streamlit as st
 from dotenv import load_dotenv
-import anyio
 
 from .config import Config
 from .loop import APIProvider, sampling_loop, APIConfig, CallbackConfig
@@ -22,17 +26,59 @@ class Sender(str, Enum):
     BOT = "assistant"
     TOOL = "tool"
 
+@dataclass(slots=True)
+class HistoryMsg:
+    """会话历史中的一条消息"""
+    role: str
+    content: Union[List[Dict[str, Any]], str, None]
+    tool_call_id: Optional[str] = None
+    name: Optional[str] = None
+    tool_calls: Optional[List[Dict[str, Any]]] = None
+    extra: Optional[Dict[str, Any]] = None
+
+    @classmethod
+    def from_dict(cls, message: Dict[str, Any]) -> 'HistoryMsg':
+        """从API格式的消息创建"""
+        fields = dict(message)
+        return cls(
+            role=fields.pop("role", ""),
+            content=fields.pop("content", ""),
+            tool_call_id=fields.pop("tool_call_id", None),
+            name=fields.pop("name", None),
+            tool_calls=fields.pop("tool_calls", None),
+            extra=fields or None,
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为API格式的消息"""
+        message = {"role": self.role, "content": self.content}
+        if self.tool_call_id is not None:
+            message["tool_call_id"] = self.tool_call_id
+        if self.name is not None:
+            message["name"] = self.name
+        if self.tool_calls is not None:
+            message["tool_calls"] = self.tool_calls
+        if self.extra:
+            message.update(self.extra)
+        return message
+
 class StreamlitUI:
     """Streamlit用户界面管理器"""
 
+    # 立即渲染的最近消息条数，更早的消息在输入框出现后再填充
+    RECENT_MESSAGES = 20
+
     def __init__(self):
         """初始化UI管理器"""
         self.config = Config.get_instance()
-        self.setup_page()
+        # 渲染消息历史时对会话状态的本地引用
+        self._tools: Dict[str, ToolResult] = {}
+        self._tool_call_index: Dict[str, Dict[str, Any]] = {}
+        self._plan: List[Any] = []
         self.initialize_session_state()
 
     def setup_page(self):
-        """设置页面配置"""
+        """设置页面配置，每次运行脚本时都要在其他Streamlit命令之前调用"""
         st.set_page_config(
             page_title="计算机控制助手",
             page_icon="🖥️",
@@ -46,6 +92,10 @@ class StreamlitUI:
             st.session_state.messages = []
         if "tools" not in st.session_state:
             st.session_state.tools = {}
+        if "image_store" not in st.session_state:
+            st.session_state.image_store = {}
+        if "decoded_images" not in st.session_state:
+            st.session_state.decoded_images = {}
         if "api_key" not in st.session_state:
             st.session_state.api_key = os.getenv("OPENROUTER_API_KEY", "")
         if "base_url" not in st.session_state:
@@ -56,28 +106,56 @@ class StreamlitUI:
             st.session_state.hide_images = False
         if "browser_instance" not in st.session_state:
             st.session_state.browser_instance = None
+        if "render_plan" not in st.session_state:
+            self.reset_render_plan()
+
+    @staticmethod
+    def reset_render_plan():
+        """清空渲染计划，下次渲染时从头生成"""
+        # 渲染计划: 已由消息历史转换得到的(发送者, 内容)列表
+        st.session_state.render_plan = []
+        st.session_state.rendered_until = 0
+        st.session_state.rendered_tail = None
+        st.session_state.tool_call_index = {}
 
     def render_sidebar(self):
         """渲染侧边栏"""
         with st.sidebar:
-            st.title("⚙️ 设置")
-            
-            # API配置
-            st.header("API配置")
-            st.session_state.api_key = st.text_input(
-                "API密钥",
-                value=st.session_state.api_key,
-                type="password"
-            )
-            st.session_state.base_url = st.text_input(
-                "API基础URL",
-                value=st.session_state.base_url
-            )
-            st.session_state.model = st.text_input(
-                "模型名称",
-                value=st.session_state.model
-            )
-            
+            self._render_settings()
+
+    @st.fragment
+    def _render_settings(self):
+        """渲染设置项，作为局部片段运行，修改设置时不重新渲染聊天历史"""
+        st.title("⚙️ 设置")
+        
+        # API配置
+        st.header("API配置")
+        st.session_state.api_key = st.text_input(
+            "API密钥",
+            value=st.session_state.api_key,
+            type="password"
+        )
+        st.session_state.base_url = st.text_input(
+            "API基础URL",
+            value=st.session_state.base_url
+        )
+        st.session_state.model = st.text_input(
+            "模型名称",
+            value=st.session_state.model
+        )
+        
+        hide_images = st.checkbox(
+            "隐藏图片",
+            value=st.session_state.hide_images,
+            help="是否在界面上隐藏截图"
+        )
+        if hide_images != st.session_state.hide_images:
+            # 图片显示状态影响聊天历史，需要整页重新运行
+            st.session_state.hide_images = hide_images
+            st.rerun()
+        
+        # 工具配置放在表单中，提交后统一生效，编辑过程中不触发重新运行
+        with st.form("config_form"):
             # Computer工具配置
             st.header("🖥️ Computer工具配置")
             typing_group_size = st.number_input(
@@ -112,12 +190,7 @@ class StreamlitUI:
                 step=1,
                 help="只保留最近的N张图片"
             )
-            st.session_state.hide_images = st.checkbox(
-                "隐藏图片",
-                value=st.session_state.hide_images,
-                help="是否在界面上隐藏截图"
-            )
-            
+        
             # Edit工具配置
             st.header("📝 Edit工具配置")
             snippet_lines = st.number_input(
@@ -128,7 +201,23 @@ class StreamlitUI:
                 step=1,
                 help="显示编辑操作前后的上下文行数"
             )
-            
+        
+            # Browser工具配置
+            st.header("🌍 Browser工具配置")
+            disable_images = st.checkbox(
+                "不加载网页图片",
+                value=self.config.browser.DISABLE_IMAGES,
+                help="加快网页加载，截图中将不显示图片；在下次启动浏览器时生效"
+            )
+            screenshot_quality = st.number_input(
+                "网页截图质量",
+                min_value=1,
+                max_value=100,
+                value=self.config.browser.SCREENSHOT_QUALITY,
+                step=1,
+                help="网页截图的JPEG质量，越低图片越小"
+            )
+        
             # 路径配置
             st.header("📁 路径配置")
             output_dir = st.text_input(
@@ -136,7 +225,7 @@ class StreamlitUI:
                 value=str(self.config.path.OUTPUT_DIR),
                 help="工具输出文件的保存目录"
             )
-            
+        
             # API配置
             st.header("🌐 API配置")
             max_tokens = st.number_input(
@@ -156,28 +245,34 @@ class StreamlitUI:
                 help="API请求的超时时间"
             )
             
-            # 更新配置
-            self.config.computer.TYPING_GROUP_SIZE = typing_group_size
-            self.config.computer.SCREENSHOT_DELAY = screenshot_delay
-            self.config.computer.MAX_IMAGE_SIZE = int(max_image_size * 1024 * 1024)
-            self.config.computer.ONLY_N_MOST_RECENT_IMAGES = only_n_most_recent_images
-            self.config.edit.SNIPPET_LINES = snippet_lines
-            self.config.path.OUTPUT_DIR = output_dir
-            self.config.api.MAX_TOKENS = max_tokens
-            self.config.api.REQUEST_TIMEOUT = request_timeout
-            
-            # 清除历史
-            if st.button("🗑️ 清除聊天历史"):
-                # 如果有浏览器实例，先关闭它
-                if st.session_state.browser_instance:
-                    try:
-                        st.session_state.browser_instance._driver.quit()
-                    except:
-                        pass
-                    st.session_state.browser_instance = None
-                st.session_state.messages = []
-                st.session_state.tools = {}
-                st.rerun()
+            if st.form_submit_button("应用"):
+                # 更新配置
+                self.config.computer.TYPING_GROUP_SIZE = typing_group_size
+                self.config.computer.SCREENSHOT_DELAY = screenshot_delay
+                self.config.computer.MAX_IMAGE_SIZE = int(max_image_size * 1024 * 1024)
+                self.config.computer.ONLY_N_MOST_RECENT_IMAGES = only_n_most_recent_images
+                self.config.edit.SNIPPET_LINES = snippet_lines
+                self.config.browser.DISABLE_IMAGES = disable_images
+                self.config.browser.SCREENSHOT_QUALITY = screenshot_quality
+                self.config.path.OUTPUT_DIR = output_dir
+                self.config.api.MAX_TOKENS = max_tokens
+                self.config.api.REQUEST_TIMEOUT = request_timeout
+        
+        # 清除历史
+        if st.button("🗑️ 清除聊天历史"):
+            # 如果有浏览器实例，先关闭它
+            if st.session_state.browser_instance:
+                try:
+                    st.session_state.browser_instance._driver.quit()
+                except:
+                    pass
+                st.session_state.browser_instance = None
+            st.session_state.messages = []
+            st.session_state.tools = {}
+            st.session_state.image_store = {}
+            st.session_state.decoded_images = {}
+            self.reset_render_plan()
+            st.rerun()
 
     def _render_message(
         self,
@@ -187,107 +282,155 @@ class StreamlitUI:
         """渲染单条消息"""
         if not message:
             return
+        if (
+            isinstance(message, ToolResult)
+            and st.session_state.hide_images
+            and not (message.output or message.error)
+        ):
+            # 只有图片的结果在隐藏图片时不创建空的消息容器
+            return
             
         with st.chat_message(sender):
-            if isinstance(message, ToolResult):
-                if message.output:
-                    st.code(message.output)
-                if message.error:
-                    st.error(message.error)
-                if message.base64_image and not st.session_state.hide_images:
-                    st.image(base64.b64decode(message.base64_image))
-            elif isinstance(message, dict):
-                if message.get("type") == "text":
-                    st.markdown(message.get("text", ""))
-                elif message.get("type") == "tool_use":
-                    st.code(f'使用工具: {message.get("name", "")}\n输入: {message.get("input", "")}')
-                elif message.get("type") == "error":
-                    st.error(message.get("text", ""))
-            else:
-                st.markdown(str(message))
-
-    def render_messages(self):
-        """渲染消息历史"""
-        def _should_skip_user_message(index: int, messages: list) -> bool:
-            """判断是否需要跳过用户消息"""
-            return (index > 0 and 
-                    isinstance(messages[index-1], dict) and 
-                    messages[index-1].get("role") == "tool")
-
-        def _render_tool_call(message: dict, prev_messages: list) -> None:
-            """渲染工具调用消息"""
-            tool_call_id = message.get("tool_call_id", "")
-            if tool_call_id not in st.session_state.tools:
-                return
-
-            # 查找工具调用参数
-            tool_calls = prev_messages.get("tool_calls", [])
-            tool_call = next((call for call in tool_calls 
-                            if call["id"] == tool_call_id), {})
-            tool_args = tool_call.get("function", {}).get("arguments", "")
-
-            # 渲染工具使用信息和结果
-            self._render_message(
-                Sender.BOT,
-                {
-                    "type": "tool_use",
-                    "name": message.get("name", ""),
-                    "input": tool_args,
-                }
-            )
-            self._render_message(Sender.TOOL, st.session_state.tools[tool_call_id])
-
-        def _render_content_blocks(role: str, content: list) -> None:
-            """渲染消息内容块"""
+            self._render_message_body(message)
+
+    @staticmethod
+    def _render_message_body(message: Union[str, Dict[str, Any], ToolResult]):
+        """在当前容器中渲染消息内容"""
+        if isinstance(message, ToolResult):
+            if message.output:
+                st.code(message.output)
+            if message.error:
+                st.error(message.error)
+            if message.base64_image and not st.session_state.hide_images:
+                st.image(_decode_image(message.base64_image))
+        elif isinstance(message, dict):
+            renderer = _RENDERERS.get(message.get("type"))
+            if renderer:
+                renderer(message)
+        else:
+            st.markdown(str(message))
+
+    def _emit(self, sender: Sender, message: Union[str, Dict[str, Any], ToolResult]) -> None:
+        """将一条待渲染消息加入渲染计划"""
+        if message:
+            self._plan.append((sender, message))
+
+    def _render_text_block(self, block: Dict[str, Any], role: str) -> None:
+        """渲染文本内容块"""
+        self._emit(role, block.get("text", ""))
+
+    def _render_tool_use_block(self, block: Dict[str, Any], role: str) -> None:
+        """渲染工具调用内容块"""
+        self._emit(Sender.BOT, {**block, "input": _format_tool_input(block.get("input", ""))})
+
+    def _render_tool_result_block(self, block: Dict[str, Any], role: str) -> None:
+        """渲染工具结果内容块"""
+        result = self._tools.get(block.get("tool_use_id", ""))
+        if result is not None:
+            self._emit(Sender.TOOL, result)
+
+    def _render_content_message(self, message: HistoryMsg, index: int, messages: List[HistoryMsg]) -> None:
+        """渲染普通消息的内容"""
+        content = message.content
+        if isinstance(content, str):
+            self._emit(message.role, content)
+        elif isinstance(content, list):
             for block in content:
-                if not isinstance(block, dict):
-                    continue
-                if block.get("type") == "tool_result":
-                    tool_id = block.get("tool_use_id", "")
-                    if tool_id in st.session_state.tools:
-                        self._render_message(Sender.TOOL, st.session_state.tools[tool_id])
-                elif block.get("type") == "text":
-                    self._render_message(role, block.get("text", ""))
-
-        # 主渲染逻辑
-        for i, message in enumerate(st.session_state.messages):
-            if not isinstance(message, dict):
-                continue
-
-            role = message.get("role", "")
-            content = message.get("content", "")
-
-            # 跳过特定条件下的用户消息
-            if role == "user" and _should_skip_user_message(i, st.session_state.messages):
-                continue
-
-            # 根据消息类型进行渲染
-            if role == "tool":
-                _render_tool_call(message, st.session_state.messages[i-1])
-            elif isinstance(content, str):
-                self._render_message(role, content)
-            elif isinstance(content, list):
-                _render_content_blocks(role, content)
-
-    async def handle_user_input(self):
+                if isinstance(block, dict):
+                    _BLOCK_RENDERERS.get(block.get("type"), _noop)(self, block, message.role)
+
+    def _render_user_message(self, message: HistoryMsg, index: int, messages: List[HistoryMsg]) -> None:
+        """渲染用户消息，跳过紧跟在工具消息之后的用户消息"""
+        if index > 0 and messages[index-1].role == "tool":
+            return
+        self._render_content_message(message, index, messages)
+
+    def _render_tool_message(self, message: HistoryMsg, index: int, messages: List[HistoryMsg]) -> None:
+        """渲染工具调用消息"""
+        tool_call_id = message.tool_call_id or ""
+        result = self._tools.get(tool_call_id)
+        if result is None:
+            return
+
+        # 查找工具调用参数
+        tool_call = self._tool_call_index.get(tool_call_id, {})
+        tool_args = tool_call.get("function", {}).get("arguments", "")
+
+        # 渲染工具使用信息和结果
+        self._emit(
+            Sender.BOT,
+            {
+                "type": "tool_use",
+                "name": message.name or "",
+                "input": _format_tool_input(tool_args),
+            }
+        )
+        self._emit(Sender.TOOL, result)
+
+    def render_messages(self) -> List[Any]:
+        """
+        渲染消息历史，只为新增的消息生成渲染计划。
+        
+        Returns:
+            较早消息的(占位符, 发送者, 内容)列表，由_render_backlog填充
+        """
+        messages = st.session_state.messages
+        start = st.session_state.rendered_until
+        if start > len(messages) or (start and messages[start-1] is not st.session_state.rendered_tail):
+            # 消息历史已被替换，重新生成
+            self.reset_render_plan()
+            start = 0
+
+        # 渲染过程中通过本地引用访问会话状态，避免反复经过session_state代理
+        # 工具调用ID -> 工具调用，随助手消息逐步建立
+        tool_call_index = self._tool_call_index = st.session_state.tool_call_index
+        self._tools = st.session_state.tools
+        self._plan = st.session_state.render_plan
+        for i in range(start, len(messages)):
+            message = messages[i]
+            if message.tool_calls:
+                for call in message.tool_calls:
+                    tool_call_index[call["id"]] = call
+            renderer = _ROLE_RENDERERS.get(message.role, StreamlitUI._render_content_message)
+            renderer(self, message, i, messages)
+        if messages:
+            st.session_state.rendered_until = len(messages)
+            st.session_state.rendered_tail = messages[-1]
+
+        # 先为较早的消息预留位置，只立即渲染最近的消息
+        plan = self._plan
+        split = max(len(plan) - self.RECENT_MESSAGES, 0)
+        backlog = [(st.empty(), sender, message) for sender, message in plan[:split]]
+        for sender, message in plan[split:]:
+            self._render_message(sender, message)
+        return backlog
+
+    async def _render_backlog(self, backlog: List[Any]) -> None:
+        """让出事件循环后填充较早消息的占位符"""
+        if not backlog:
+            return
+        await asyncio.sleep(0)
+        for slot, sender, message in backlog:
+            with slot.container():
+                self._render_message(sender, message)
+
+    async def handle_user_input(self, prompt: Optional[str]):
         """处理用户输入"""
-        if prompt := st.chat_input("输入你的指令..."):
+        if prompt:
             st.chat_message("user").write(prompt)
-            st.session_state.messages.append({
-                "role": "user",
-                "content": prompt
-            })
+            st.session_state.messages.append(HistoryMsg(role="user", content=prompt))
             
             await self.process_messages()
 
-    async def _run_sampling_loop(self):
+    async def _run_sampling_loop(self, history: List[HistoryMsg]):
         """运行采样循环"""
-        def output_callback(content: Dict[str, Any]):
-            """输出回调"""
-            self._render_message(Sender.BOT, content)
+        batched = BatchedRenderer(Sender.BOT)
 
         def tool_output_callback(result: ToolResult, tool_id: str):
             """工具输出回调"""
+            # 先输出缓冲中的模型内容，保证显示顺序
+            batched.close()
+
             # 缓存工具结果
             st.session_state.tools[tool_id] = result
             
@@ -309,6 +452,7 @@ class StreamlitUI:
         def api_response_callback(response: Optional[Any], error: Optional[Exception]):
             """API响应回调"""
             if error:
+                batched.close()
                 self._render_message(
                     Sender.BOT,
                     {
@@ -316,7 +460,12 @@ class StreamlitUI:
                         "text": f"API错误: {str(error)}"
                     }
                 )
-                if response:
+                if isinstance(response, httpx.Response):
+                    self._render_message(
+                        Sender.BOT,
+                        _format_http_exchange(response)
+                    )
+                elif response:
                     self._render_message(
                         Sender.BOT,
                         response
@@ -332,16 +481,20 @@ class StreamlitUI:
 
         # 创建回调配置
         callback_config = CallbackConfig(
-            output=output_callback,
+            output=batched.push,
             tool_output=tool_output_callback,
             api_response=api_response_callback
         )
 
-        return await sampling_loop(
-            api_config=api_config,
-            callback_config=callback_config,
-            messages=st.session_state.messages,
-        )
+        try:
+            return await sampling_loop(
+                api_config=api_config,
+                callback_config=callback_config,
+                messages=[message.to_dict() for message in history],
+                image_store=st.session_state.image_store,
+            )
+        finally:
+            batched.close()
 
     async def process_messages(self):
         """处理消息并调用API"""
@@ -352,35 +505,246 @@ class StreamlitUI:
         with st.spinner("思考中..."):
             try:
                 # 运行采样循环
-                messages = await self._run_sampling_loop()
+                # 只发送最近几轮对话
+                history = st.session_state.messages
+                start = _history_window(history, self.config.api.MAX_HISTORY_TURNS)
+                messages = await self._run_sampling_loop(history[start:])
                 
                 # 更新消息历史
                 if messages:
-                    st.session_state.messages = messages
+                    # 采样循环只在末尾追加消息，已有部分沿用原对象以便增量渲染
+                    st.session_state.messages = history + [
+                        HistoryMsg.from_dict(message) for message in messages[len(history) - start:]
+                    ]
                 
             except Exception as e:
                 st.error(f"处理消息时出错: {str(e)}")
 
     async def run(self):
         """运行UI"""
+        self.setup_page()
         st.title("🖥️ 计算机控制助手")
         
         # 渲染侧边栏
         self.render_sidebar()
         
-        # 显示历史消息
-        self.render_messages()
+        # 显示最近的历史消息
+        backlog = self.render_messages()
+        prompt = st.chat_input("输入你的指令...")
+        
+        # 输入框出现后再渲染较早的消息
+        await self._render_backlog(backlog)
         
         # 处理用户输入
-        await self.handle_user_input()
+        await self.handle_user_input(prompt)
+
+@dataclass
+class _RenderBuffer:
+    """待输出的内容缓冲"""
+    pending_text: List[str] = field(default_factory=list)
+    pending_blocks: List[Dict[str, Any]] = field(default_factory=list)
+    last_flush: float = 0.0
+
+class BatchedRenderer:
+    """缓冲采样循环输出的内容块，限频写入同一个聊天消息容器
+
+    连续的文本块合并后写入同一个占位符，不再逐块新建markdown元素。
+    所有Streamlit调用都在调用方的任务中同步进行，重新运行请求引发的异常才能正常传递。
+    """
+
+    MAX_BATCH = 4
+    FLUSH_INTERVAL = 0.05
+
+    def __init__(self, sender: Sender):
+        self._sender = sender
+        self._buffer = _RenderBuffer()
+        self._container = None
+        self._text_slot = None
+        self._text: List[str] = []
+
+    def push(self, block: Dict[str, Any]) -> None:
+        """加入一个内容块，距上次输出超过间隔或满批时立即输出，否则留到下次加入或close时输出"""
+        if not block:
+            return
+        buffer = self._buffer
+        if block.get("type") == "text":
+            buffer.pending_text.append(block.get("text", ""))
+        else:
+            self._move_text()
+            buffer.pending_blocks.append(block)
+        if (
+            len(buffer.pending_blocks) >= self.MAX_BATCH
+            or time.monotonic() - buffer.last_flush > self.FLUSH_INTERVAL
+        ):
+            self.flush()
+
+    def _move_text(self) -> None:
+        """将累积的文本合并为一个文本块"""
+        buffer = self._buffer
+        if buffer.pending_text:
+            buffer.pending_blocks.append({"type": "text", "text": "\n\n".join(buffer.pending_text)})
+            buffer.pending_text.clear()
+
+    def flush(self) -> None:
+        """将缓冲的内容渲染到当前消息容器"""
+        self._move_text()
+        buffer = self._buffer
+        buffer.last_flush = time.monotonic()
+        if not buffer.pending_blocks:
+            return
+        blocks, buffer.pending_blocks = buffer.pending_blocks, []
+
+        if self._container is None:
+            self._container = st.chat_message(self._sender)
+        with self._container:
+            for block in blocks:
+                if block.get("type") == "text":
+                    # 同一段连续文本复用一个占位符
+                    if self._text_slot is None:
+                        self._text_slot = st.empty()
+                    self._text.append(block["text"])
+                    self._text_slot.markdown("\n\n".join(self._text))
+                else:
+                    self._text_slot = None
+                    self._text = []
+                    StreamlitUI._render_message_body(block)
+
+    def close(self) -> None:
+        """输出剩余内容并结束当前消息容器，之后的内容写入新的容器"""
+        self.flush()
+        self._container = None
+        self._text_slot = None
+        self._text = []
+
+# 每个会话最多缓存的解码图片数量
+_DECODED_IMAGE_LIMIT = 10
+
+def _decode_image(b64: str) -> bytes:
+    """
+    解码base64图片，每个会话最多缓存_DECODED_IMAGE_LIMIT张，随聊天历史一起清除。
+    
+    每次重新运行都按相同顺序渲染全部历史图片，按最近使用淘汰会在图片数超过上限时全部失效，
+    因此缓存满后新的图片直接解码而不加入缓存。
+    """
+    decoded = st.session_state.decoded_images
+    data = decoded.get(b64)
+    if data is None:
+        data = base64.b64decode(b64)
+        if len(decoded) < _DECODED_IMAGE_LIMIT:
+            decoded[b64] = data
+    return data
+
+def _history_window(messages: List[HistoryMsg], max_turns: int) -> int:
+    """返回最近max_turns轮对话的起始下标，只在用户输入处截断以保持工具调用完整"""
+    if max_turns <= 0:
+        return 0
+    turns = 0
+    for i in range(len(messages) - 1, -1, -1):
+        # 紧跟工具消息的用户消息是工具结果，不是新的一轮
+        if messages[i].role == "user" and not (i > 0 and messages[i-1].role == "tool"):
+            turns += 1
+            if turns == max_turns:
+                return i
+    return 0
+
+def _pretty_json(raw: Union[bytes, str]) -> str:
+    """将JSON文本格式化为缩进形式，无法解析时原样返回"""
+    try:
+        return orjson.dumps(orjson.loads(raw), option=orjson.OPT_INDENT_2).decode()
+    except orjson.JSONDecodeError:
+        return raw.decode(errors="replace") if isinstance(raw, bytes) else raw
+
+def _format_tool_input(tool_input: Any) -> str:
+    """将工具参数格式化为缩进的JSON文本，已格式化的字符串只解析一次"""
+    if isinstance(tool_input, str):
+        return _pretty_json(tool_input) if tool_input.startswith("{") and "\n" not in tool_input else tool_input
+    try:
+        return orjson.dumps(tool_input, option=orjson.OPT_INDENT_2).decode()
+    except TypeError:
+        return str(tool_input)
+
+def _format_http_exchange(response: httpx.Response) -> Dict[str, Any]:
+    """一次性格式化HTTP请求和响应体，渲染时直接作为代码块展示"""
+    return {
+        "type": "http",
+        "request": _pretty_json(response.request.read()),
+        "response": _pretty_json(response.read()),
+    }
+
+def _noop(*args) -> None:
+    """未知类型的内容块不做渲染"""
+
+def _render_http(block: Dict[str, Any]) -> None:
+    """渲染HTTP请求和响应体"""
+    st.code(block.get("request", ""), language="json")
+    st.code(block.get("response", ""), language="json")
+
+# 按字典消息类型分派渲染函数
+_RENDERERS = {
+    "text": lambda block: st.markdown(block.get("text", "")),
+    "tool_use": lambda block: st.code(f'使用工具: {block.get("name", "")}\n输入: {_format_tool_input(block.get("input", ""))}'),
+    "error": lambda block: st.error(block.get("text", "")),
+    "http": _render_http,
+}
+
+# 按内容块类型和消息角色分派渲染方法，避免逐条if/elif比较
+_BLOCK_RENDERERS = {
+    "text": StreamlitUI._render_text_block,
+    "tool_use": StreamlitUI._render_tool_use_block,
+    "tool_result": StreamlitUI._render_tool_result_block,
+}
+
+_ROLE_RENDERERS = {
+    "user": StreamlitUI._render_user_message,
+    "tool": StreamlitUI._render_tool_message,
+}
 
 async def main():
     """主函数"""
     try:
-        ui = StreamlitUI()
+        # 在会话中复用UI管理器，避免每次重新运行时重复初始化
+        ui = st.session_state.get("_ui")
+        if ui is None:
+            ui = st.session_state._ui = StreamlitUI()
         await ui.run()
     except Exception as e:
         st.error(f"应用程序错误: {str(e)}")
 
+def _get_event_loop() -> asyncio.AbstractEventLoop:
+    """获取会话中复用的事件循环，避免每次重新运行都创建新的事件循环"""
+    loop = st.session_state.get("_loop")
+    if loop is None or loop.is_closed() or loop.is_running():
+        # 仍在运行的旧循环由其所在的运行在结束时关闭(见run_app)
+        loop = asyncio.new_event_loop()
+        st.session_state._loop = loop
+    return loop
+
+def _cancel_remaining_tasks(loop: asyncio.AbstractEventLoop) -> None:
+    """取消本次运行遗留的任务并等待它们结束"""
+    tasks = asyncio.all_tasks(loop)
+    if not tasks:
+        return
+    for task in tasks:
+        task.cancel()
+    loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+
+def run_app():
+    """在会话的事件循环中运行主函数，结束后完成asyncio.run同样的清理"""
+    loop = _get_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        loop.run_until_complete(main())
+    finally:
+        try:
+            _cancel_remaining_tasks(loop)
+            loop.run_until_complete(loop.shutdown_asyncgens())
+        finally:
+            # 运行期间被新的事件循环替换时，此循环不会再被使用，关闭它及其默认线程池
+            if st.session_state.get("_loop") is not loop:
+                try:
+                    loop.run_until_complete(loop.shutdown_default_executor())
+                finally:
+                    loop.close()
+
 if __name__ == "__main__":
-    anyio.run(main)
+    run_app()
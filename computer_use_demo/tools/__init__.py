@@ -1,5 +1,7 @@
 """工具包初始化模块"""
 
+from importlib import import_module
+
 from .base import (
     BaseTool,
     ToolResult,
@@ -7,9 +9,7 @@ from .base import (
     ToolFactory
 )
 from .command import CommandTool
-from .computer import ComputerTool
 from .edit import EditTool
-from .browser import BrowserTool
 from .exceptions import (
     ToolError,
     ValidationError,
@@ -40,3 +40,18 @@ __all__ = [
     'APIError',
     'ConfigurationError'
 ]
+
+# 依赖较重的工具（selenium、pyautogui等）在首次访问时才导入
+_LAZY_TOOLS = {
+    'ComputerTool': '.computer',
+    'BrowserTool': '.browser',
+}
+
+def __getattr__(name: str):
+    """按需导入工具类"""
+    module_name = _LAZY_TOOLS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
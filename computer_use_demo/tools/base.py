@@ -2,13 +2,13 @@
 
 import logging
 from abc import ABC, abstractmethod
-from dataclasses import dataclass
-from typing import Any, Dict, Optional, Type
+from dataclasses import dataclass, replace
+from typing import Any, ClassVar, Dict, Optional, Type
 
 from ..config import Config
 from .exceptions import ToolError, ValidationError
 
-@dataclass
+@dataclass(slots=True)
 class ToolResult:
     """工具执行结果"""
     output: Optional[str] = None
@@ -16,23 +16,34 @@ class ToolResult:
     base64_image: Optional[str] = None
     system: Optional[str] = None
 
+    def __repr__(self) -> str:
+        """图片数据只显示长度，避免日志中输出完整base64字符串"""
+        image = f"<{len(self.base64_image)} chars>" if self.base64_image else None
+        return (
+            f"ToolResult(output={self.output!r}, error={self.error!r}, "
+            f"base64_image={image}, system={self.system!r})"
+        )
+
     def is_success(self) -> bool:
         """检查执行是否成功"""
         return self.error is None
 
     def with_error(self, error: str) -> 'ToolResult':
-        """创建一个带有错误信息的新结果"""
-        return ToolResult(error=error)
+        """创建一个带有错误信息的新结果，其余字段保持不变"""
+        return replace(self, error=error)
 
     def with_output(self, output: str) -> 'ToolResult':
-        """创建一个带有输出的新结果"""
-        return ToolResult(output=output)
+        """创建一个带有输出的新结果，其余字段保持不变"""
+        return replace(self, output=output)
 
 class BaseTool(ABC):
     """工具基类"""
+
+    # 配置为单例，在类上只获取一次
+    _config: ClassVar[Config] = Config.get_instance()
     
     def __init__(self):
-        self.config = Config.get_instance()
+        self.config = BaseTool._config
         self.logger = logging.getLogger(self.__class__.__name__)
 
     @property
@@ -49,10 +60,13 @@ class BaseTool(ABC):
     async def __call__(self, **kwargs) -> ToolResult:
         """调用工具"""
         try:
-            self.logger.debug(f"执行工具 {self.name} 参数: {kwargs}")
+            debug = self.logger.isEnabledFor(logging.DEBUG)
+            if debug:
+                self.logger.debug("执行工具 %s 参数: %s", self.name, kwargs)
             await self.validate_params(**kwargs)
             result = await self.execute(**kwargs)
-            self.logger.debug(f"工具 {self.name} 执行结果: {result}")
+            if debug:
+                self.logger.debug("工具 %s 执行结果: %s", self.name, result)
             return result
         except ValidationError as e:
             self.logger.error(f"参数验证错误: {e}")
@@ -72,19 +86,42 @@ class ToolFactory:
     """工具工厂类"""
     
     _tools: Dict[str, Type[BaseTool]] = {}
+    _descriptions: Dict[str, Optional[Dict[str, Any]]] = {}
 
     @classmethod
     def register(cls, tool_class: Type[BaseTool]) -> Type[BaseTool]:
         """注册工具类"""
         cls._tools[tool_class.name] = tool_class
+        cls._descriptions.pop(tool_class.name, None)
         return tool_class
 
+    @classmethod
+    def describe(cls, name: str) -> Optional[Dict[str, Any]]:
+        """获取工具的函数定义，首次构建后缓存，无需创建工具实例"""
+        if name not in cls._descriptions:
+            tool_class = cls._tools.get(name)
+            if tool_class is None:
+                raise ValidationError(f"未知的工具: {name}")
+            description = None
+            if hasattr(tool_class, "parameters_schema"):
+                description = {
+                    "type": "function",
+                    "function": {
+                        "name": tool_class.name,
+                        "description": tool_class.__doc__.strip(),
+                        "parameters": tool_class.parameters_schema
+                    }
+                }
+            cls._descriptions[name] = description
+        return cls._descriptions[name]
+
     @classmethod
     def create(cls, name: str, **kwargs) -> BaseTool:
         """创建工具实例"""
-        if name not in cls._tools:
+        tool_class = cls._tools.get(name)
+        if tool_class is None:
             raise ValidationError(f"未知的工具: {name}")
-        return cls._tools[name](**kwargs)
+        return tool_class(**kwargs)
 
 class ToolCollection:
     """工具集合类"""
@@ -94,6 +131,7 @@ class ToolCollection:
 
     async def run(self, name: str, tool_input: Dict[str, Any]) -> ToolResult:
         """运行指定的工具"""
-        if name not in self.tools:
+        tool = self.tools.get(name)
+        if tool is None:
             return ToolResult(error=f"工具 {name} 未找到")
-        return await self.tools[name](**tool_input)
+        return await tool(**tool_input)
@@ -1,9 +1,13 @@
 """简单的浏览器自动化工具"""
 
-import base64
-import json
+import asyncio
+import hashlib
+import re
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache, partial
 from pathlib import Path
-from typing import Optional, Dict, Any, List, Literal
+from typing import Optional, Dict, Any, List, Literal, Tuple
+from urllib.parse import urljoin
 from dataclasses import dataclass
 
 from selenium import webdriver
@@ -12,12 +16,139 @@ from selenium.webdriver.edge.options import Options
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException, NoSuchElementException
-from bs4 import BeautifulSoup
+from selenium.common.exceptions import (
+    TimeoutException, NoSuchElementException, StaleElementReferenceException,
+    InvalidSelectorException, WebDriverException,
+)
+from bs4 import BeautifulSoup, SoupStrainer
 
 from .base import BaseTool, ToolResult, ToolFactory
 from .exceptions import ToolError, ValidationError
 
+# HTML解析器，优先使用基于libxml2的lxml，未安装时退回内置解析器
+try:
+    import lxml  # noqa: F401
+    _HTML_PARSER = 'lxml'
+except ImportError:
+    _HTML_PARSER = 'html.parser'
+
+# 可以直接用于#id和.class选择器的标识符
+_CSS_IDENT = re.compile(r'-?[A-Za-z_][\w-]*')
+# 从a[href='...']选择器中提取href值，允许其中包含转义字符
+_HREF_PATTERN = re.compile(r"\[href='((?:[^'\\]|\\.)*)'\]")
+_CSS_UNESCAPE = re.compile(r"\\(.)")
+
+# CSS字符串中需要转义的字符: 反斜杠、引号和换行
+_CSS_QUOTE = str.maketrans({'\\': '\\\\', "'": "\\'", '\n': '\\a '})
+
+def _css_literal(value: Any) -> str:
+    """将值转换为带引号的CSS字符串，一次替换完成所有转义"""
+    return f"'{str(value).translate(_CSS_QUOTE)}'"
+
+def _css_id(element_id: str) -> str:
+    """生成id选择器，id不是合法标识符时使用属性选择器"""
+    if _CSS_IDENT.fullmatch(element_id):
+        return f"#{element_id}"
+    return f"[id={_css_literal(element_id)}]"
+
+def _css_class(cls: str) -> str:
+    """生成class选择器，class不是合法标识符时使用属性选择器"""
+    if _CSS_IDENT.fullmatch(cls):
+        return f".{cls}"
+    return f"[class~={_css_literal(cls)}]"
+
+# 由selector_type或其他规则单独处理、不作为普通属性条件加入选择器的属性
+_SPECIAL_ATTRS = frozenset({'class', 'role'})
+
+# 同时打开多个网页时最多并行加载的标签页数量
+_MAX_PARALLEL_TABS = 4
+
+# 执行浏览器操作的专用线程池，不与事件循环默认线程池中的其他任务争用；
+# 同一浏览器上的操作依次执行，线程数即可同时操作的浏览器(会话)数
+_BROWSER_EXECUTOR = ThreadPoolExecutor(max_workers=4, thread_name_prefix="browser")
+
+# get_content默认最多返回的元素数量和文本字符数，避免大页面的输出过长
+_DEFAULT_LIMIT = 200
+_DEFAULT_MAX_CHARS = 50000
+
+# CSS选择器可能的开头字符
+_CSS_START = re.compile(r'[#.\[*:>+~A-Za-z_-]')
+# 按链接文本查找时的等待时间(秒)
+_LINK_TEXT_WAIT = 2
+
+# 元素不可见时滚动到元素位置，返回元素是否可用
+_PREPARE_CLICK_SCRIPT = (
+    "const e = arguments[0];"
+    "if (!e.getClientRects().length || getComputedStyle(e).visibility === 'hidden') e.scrollIntoView(true);"
+    "return !e.disabled;"
+)
+
+@lru_cache(maxsize=256)
+def _locator(selector: str, link_text: bool = True) -> Tuple[str, str]:
+    """
+    根据选择器语法确定唯一的定位方式: XPath、CSS选择器或链接文本。
+    
+    link_text为False时只区分XPath和CSS选择器，用于查找输入框等不可能按链接文本匹配的元素。
+    """
+    if selector.startswith(('/', './', '(')):
+        return (By.XPATH, selector)
+    if not link_text or _CSS_START.match(selector):
+        return (By.CSS_SELECTOR, selector)
+    return (By.LINK_TEXT, selector)
+
+def _first_element(
+    driver: webdriver.Edge, locators: Tuple[Tuple[str, str], ...]
+) -> Optional[webdriver.remote.webelement.WebElement]:
+    """依次尝试各定位方式，返回第一个找到的元素；选择器语法无效时改用下一种方式"""
+    for i, locator in enumerate(locators):
+        try:
+            elements = driver.find_elements(*locator)
+        except InvalidSelectorException:
+            if i == len(locators) - 1:
+                raise
+            continue
+        if elements:
+            return elements[0]
+    return None
+
+# 标题标签
+_HEADING_TAGS = ('h1', 'h2', 'h3', 'h4', 'h5', 'h6')
+
+# 新标签页已离开about:blank并完成文档解析
+_TAB_READY_SCRIPT = (
+    "return document.URL !== 'about:blank' && document.readyState !== 'loading';"
+)
+
+# 读取图片、视频和音频元素的属性，缺少的属性为空字符串
+_MEDIA_SCRIPT = """
+const pick = (e, names) => Object.fromEntries(names.map(n => [n, e.getAttribute(n) || '']));
+return [
+    Array.from(document.images, e => pick(e, ['src', 'alt', 'title', 'width', 'height'])),
+    Array.from(document.querySelectorAll('video, iframe'),
+               e => Object.assign(pick(e, ['src', 'title', 'aria-label', 'width', 'height']), {tag: e.localName})),
+    Array.from(document.getElementsByTagName('audio'), e => pick(e, ['src', 'type', 'title', 'aria-label'])),
+];
+"""
+
+# text_type对应的标签
+_TEXT_TAGS = {
+    'heading': _HEADING_TAGS,
+    'paragraph': 'p',
+    'span': 'span',
+}
+
+def _filter_by_text(elements, needle: str) -> list:
+    """筛选文本中包含needle的元素，不区分大小写"""
+    needle = needle.lower()
+    return [e for e in elements if needle in e.get_text(strip=True).lower()]
+
+# 按内容类型只解析需要的标签，未列出的类型解析整个页面
+_STRAINERS = {
+    'heading': SoupStrainer(_HEADING_TAGS),
+    'paragraph': SoupStrainer('p'),
+    'span': SoupStrainer('span'),
+}
+
 @dataclass
 class Link:
     """网页链接"""
@@ -42,6 +173,11 @@ class BrowserTool(BaseTool):
                 "type": "string",
                 "description": "要打开的网页地址，必须包含完整的网址(比如https://www.google.com)或本地文件路径(比如file:///C:/index.html)"
             },
+            "urls": {
+                "type": "array",
+                "items": {"type": "string"},
+                "description": "用于visit操作时同时打开多个网页，只返回各网页的标题和地址，不改变当前页面"
+            },
             "selector": {
                 "type": "string",
                 "description": "用于定位要操作的元素的查找方式"
@@ -76,6 +212,14 @@ class BrowserTool(BaseTool):
                 "type": "string",
                 "enum": ["heading", "paragraph", "span"],
                 "description": "要获取的具体文字类型: heading(大标题/小标题), paragraph(正文段落), span(行内文本)"
+            },
+            "limit": {
+                "type": "integer",
+                "description": f"用于get_content操作时最多返回的元素数量(可点击元素、图片/视频/音频)，默认{_DEFAULT_LIMIT}"
+            },
+            "max_chars": {
+                "type": "integer",
+                "description": f"用于get_content操作获取文字内容时最多返回的字符数，默认{_DEFAULT_MAX_CHARS}"
             }
         },
         "required": ["action"],
@@ -85,6 +229,12 @@ class BrowserTool(BaseTool):
         super().__init__()
         self._driver: Optional[webdriver.Edge] = None
         self._wait: Optional[WebDriverWait] = None
+        # 推测的定位方式使用的短等待
+        self._fast_wait: Optional[WebDriverWait] = None
+        # 同一浏览器上的操作互斥执行，复用浏览器时一并复用该锁
+        self._lock = asyncio.Lock()
+        # 页面解析缓存: (页面标识, HTML摘要, HTML, 按解析范围缓存的解析结果)
+        self._soup_cache: Optional[Tuple[bytes, str, Dict[Optional[str], BeautifulSoup]]] = None
 
     async def _ensure_browser(self) -> None:
         """确保浏览器已启动"""
@@ -95,18 +245,40 @@ class BrowserTool(BaseTool):
             if st.session_state.browser_instance and st.session_state.browser_instance._driver:
                 self._driver = st.session_state.browser_instance._driver
                 self._wait = st.session_state.browser_instance._wait
+                self._fast_wait = st.session_state.browser_instance._fast_wait
+                self._lock = st.session_state.browser_instance._lock
                 return
                 
         # 否则创建新的浏览器实例
         if not self._driver:
-            import json
-
             # 设置Edge WebDriver选项
             edge_options = Options()
             edge_options.use_chromium = True
             edge_options.add_argument('--disable-gpu')
             edge_options.add_argument('--no-sandbox')
             edge_options.add_argument('--remote-allow-origins=*')
+            # 关闭与页面内容无关的后台功能，减少启动和页面加载开销
+            for argument in (
+                '--disable-extensions',
+                '--disable-background-networking',
+                '--disable-default-apps',
+                '--disable-sync',
+                '--metrics-recording-only',
+                '--mute-audio',
+                '--no-first-run',
+                '--disable-translate',
+                '--disable-features=TranslateUI',
+                '--disable-dev-shm-usage',
+                '--log-level=3',
+            ):
+                edge_options.add_argument(argument)
+            if self.config.browser.DISABLE_IMAGES:
+                edge_options.add_argument('--blink-settings=imagesEnabled=false')
+                edge_options.add_experimental_option(
+                    'prefs', {'profile.managed_default_content_settings.images': 2}
+                )
+            # DOMContentLoaded后即返回，不等待图片等子资源加载完成
+            edge_options.page_load_strategy = 'eager'
             
             # 使用默认的Edge WebDriver
             service = Service()
@@ -116,6 +288,7 @@ class BrowserTool(BaseTool):
                 self._driver = webdriver.Edge(service=service, options=edge_options)
                 print("Edge WebDriver实例创建成功")
                 self._wait = WebDriverWait(self._driver, 10)
+                self._fast_wait = WebDriverWait(self._driver, _LINK_TEXT_WAIT)
                 print("WebDriverWait实例创建成功")
                 
                 # 保存到session_state
@@ -125,8 +298,20 @@ class BrowserTool(BaseTool):
             except Exception as e:
                 raise ToolError(f"启动Edge浏览器失败: {str(e)}")
 
-    def _get_unique_selector(self, element, selector_type: str, selector_attrs: Optional[Dict] = None) -> Optional[str]:
-        """获取指定类型元素的唯一选择器"""
+    def _get_unique_selector(
+        self,
+        element,
+        selector_type: str,
+        selector_attrs: Optional[Dict] = None,
+        position_cache: Optional[Dict[int, Tuple[int, Dict[int, int]]]] = None,
+        base_url: Optional[str] = None,
+    ) -> Optional[str]:
+        """
+        获取指定类型元素的唯一选择器。
+        
+        position_cache用于在多次调用间复用同级元素序号；base_url为解析相对链接的当前页面地址，
+        未提供时从浏览器读取，批量生成选择器时应预先传入以免每个链接都请求一次浏览器。
+        """
         # 处理自定义元素
         if selector_type == 'custom' and selector_attrs:
             selectors = []
@@ -134,277 +319,345 @@ class BrowserTool(BaseTool):
                 if attr == 'class':
                     # 处理class列表
                     classes = value.split() if isinstance(value, str) else value
-                    selectors.extend(f".{cls}" for cls in classes)
+                    selectors.extend(_css_class(cls) for cls in classes)
                 elif attr.startswith('aria-'):
                     # 处理aria属性
-                    selectors.append(f"[{attr}='{value}']")
+                    selectors.append(f"[{attr}={_css_literal(value)}]")
                 elif attr == 'role':
                     # 处理role属性
-                    selectors.append(f"[role='{value}']")
+                    selectors.append(f"[role={_css_literal(value)}]")
                 else:
                     # 处理其他属性
-                    selectors.append(f"[{attr}='{value}']")
+                    selectors.append(f"[{attr}={_css_literal(value)}]")
             if selectors:
                 return ''.join(selectors)
             return None
             
         # 处理常规元素
-        if selector_type not in ['custom'] and element.name != selector_type:
+        if selector_type != 'custom' and element.name != selector_type:
             return None
             
         selectors = []
+        attrs = element.attrs
         
         # 优先使用id
-        if element.get('id'):
-            element_id = element['id'].replace("'", "\\'")
-            return f"#{element_id}"
+        if element_id := attrs.get('id'):
+            return _css_id(element_id)
             
         # 处理class
-        if element.get('class'):
-            classes = ' '.join(element.get('class'))
-            if classes:
-                selectors.append(f".{classes.replace(' ', '.')}")
+        if classes := attrs.get('class'):
+            selectors.extend(_css_class(cls) for cls in classes)
                 
         # 处理role属性
-        if element.get('role'):
-            role = element['role'].replace("'", "\\'")
-            selectors.append(f"[role='{role}']")
+        if role := attrs.get('role'):
+            selectors.append(f"[role={_css_literal(role)}]")
             
         # 根据元素类型使用特定属性
-        if selector_type == 'a' and element.get('href'):
-            from urllib.parse import urljoin
-            href = element['href'].replace("'", "\\'")
+        if selector_type == 'a' and (href := attrs.get('href')):
             # 如果是相对链接，转换为绝对链接
-            if self._driver and self._driver.current_url:
-                href = urljoin(self._driver.current_url, href)
-            selectors.append(f"[href='{href}']")
+            if base_url is None and self._driver:
+                base_url = self._driver.current_url
+            if base_url:
+                href = urljoin(base_url, href)
+            selectors.append(f"[href={_css_literal(href)}]")
             
         # 添加用户指定的属性条件
         if selector_attrs:
             for attr, value in selector_attrs.items():
-                if attr not in ['class', 'role'] and not attr.startswith('aria-'):
-                    value = str(value).replace("'", "\\'")
-                    selectors.append(f"[{attr}='{value}']")
+                if attr not in _SPECIAL_ATTRS and not attr.startswith('aria-'):
+                    selectors.append(f"[{attr}={_css_literal(value)}]")
                     
         # 如果有选择器，组合它们
         if selectors:
             return f"{selector_type if selector_type != 'custom' else '*'}{''.join(selectors)}"
             
         # 如果没有唯一属性，使用元素在DOM中的位置
-        if element.parent:
-            siblings = element.parent.find_all(selector_type, recursive=False)
-            if len(siblings) > 1:
-                index = len(list(element.find_previous_siblings(selector_type))) + 1
-                return f"{selector_type}:nth-of-type({index})"
+        parent = element.parent
+        if parent:
+            positions = position_cache.get(id(parent)) if position_cache is not None else None
+            if positions is None:
+                positions = self._sibling_positions(parent, selector_type)
+                if position_cache is not None:
+                    position_cache[id(parent)] = positions
+            count, indices = positions
+            if count > 1:
+                return f"{selector_type}:nth-of-type({indices[id(element)]})"
             
         # 如果只有一个此类型的元素，直接使用标签选择器
         return selector_type if selector_type != 'custom' else None
 
+    @staticmethod
+    def _sibling_positions(parent, tag_name: str) -> Tuple[int, Dict[int, int]]:
+        """一次遍历父元素的子元素，返回同类元素数量及各元素的序号"""
+        indices = {}
+        for sibling in parent.children:
+            if sibling.name == tag_name:
+                indices[id(sibling)] = len(indices) + 1
+        return len(indices), indices
+
     def _find_clickable_element(self, selector: str) -> Optional[webdriver.remote.webelement.WebElement]:
         """查找可点击元素"""
         try:
-            # 根据选择器类型确定定位器
-            locator = (By.CSS_SELECTOR, selector)
-            if selector.startswith('//'):
-                locator = (By.XPATH, selector)
+            # 根据选择器语法确定定位器，"Login"这类文字也符合CSS语法，找不到时再按链接文本查找
+            locator = _locator(selector)
+            if locator[0] == By.CSS_SELECTOR:
+                locators = (locator, (By.LINK_TEXT, selector))
+            else:
+                locators = (locator,)
             
-            # 尝试查找元素
-            element = self._wait.until(EC.presence_of_element_located(locator))
-            if element and not element.is_displayed():
-                # 如果元素存在但不可见，尝试滚动到元素位置
-                self._driver.execute_script("arguments[0].scrollIntoView(true);", element)
-            return element if element and element.is_enabled() else None
+            # 元素通常已经存在，find_elements找不到时返回空列表而不抛出异常，一次请求即可确定
+            element = _first_element(self._driver, locators)
+            if element is None:
+                # 链接文本是推测的定位方式，缩短等待时间
+                wait = self._fast_wait if locator[0] == By.LINK_TEXT else self._wait
+                element = wait.until(lambda d: _first_element(d, locators))
+            # 可见性检查、滚动和可用性检查合并为一次脚本调用
+            enabled = self._driver.execute_script(_PREPARE_CLICK_SCRIPT, element)
+            return element if enabled else None
                 
-        except Exception:
+        except (
+            TimeoutException, NoSuchElementException,
+            StaleElementReferenceException, InvalidSelectorException,
+        ):
             return None
 
-    def _get_page_content(self, content_type: str = None, selector_type: str = "text", selector_attrs: Optional[Dict] = None, text_type: str = "paragraph", text: Optional[str] = None) -> Dict[str, Any]:
-        """获取页面内容"""
-        if not self._driver:
-            raise ToolError("浏览器未初始化")
-            
-        # 等待页面加载
-        try:
-            self._wait.until(EC.presence_of_element_located((By.TAG_NAME, "body")))
-        except TimeoutException:
-            pass  # 继续处理已加载的内容
-        
-        result = {'url': self._driver.current_url}
+    def _get_soup(self, only: Optional[str] = None) -> BeautifulSoup:
+        """
+        获取当前页面的解析结果，页面HTML未变化时复用缓存。
         
+        Args:
+            only: 解析范围，为_STRAINERS中的键时只解析对应标签，否则解析整个页面
+        """
+        # 脚本可能只修改文本或属性而不改变地址和元素数量，每次都获取HTML并按摘要判断页面是否变化
+        html = self._fetch_page()
+        digest = hashlib.blake2b(html.encode(), digest_size=8).digest()
+        cache = self._soup_cache
+        if not cache or cache[0] != digest:
+            cache = self._soup_cache = (digest, html, {})
+
+        soups = cache[2]
+        soup = soups.get(only)
+        if soup is None:
+            soup = soups[only] = BeautifulSoup(cache[1], _HTML_PARSER, parse_only=_STRAINERS.get(only))
+        return soup
+
+    def _fetch_page(self) -> str:
+        """获取包含Shadow DOM内容的页面HTML"""
         try:
-            # 获取页面内容
-            # 获取包含Shadow DOM内容的完整HTML
+            # 获取包含Shadow DOM内容的完整HTML，页面本身只序列化一次，之后追加各Shadow DOM的内容
             html = self._driver.execute_script("""
-                function getShadowDOMContent(element) {
-                    let content = element.innerHTML || '';
-                    const shadowRoots = element.querySelectorAll('*');
-                    for (const elem of shadowRoots) {
-                        if (elem.shadowRoot) {
-                            content += elem.shadowRoot.innerHTML;
-                        }
+                const parts = [document.documentElement.outerHTML];
+                for (const elem of document.querySelectorAll('*')) {
+                    if (elem.shadowRoot) {
+                        parts.push(elem.shadowRoot.innerHTML);
                     }
-                    return content;
                 }
-                return document.documentElement.outerHTML + getShadowDOMContent(document.documentElement);
+                return parts.join('');
             """)
             if not html:
                 raise ToolError("无法获取页面内容")
         except Exception as e:
             raise ToolError(f"获取页面内容失败: {str(e)}")
-            
-        soup = BeautifulSoup(html, 'html.parser')
+        return html
 
-        if content_type == "text":
-            # 移除脚本和样式
-            for tag in soup(['script', 'style']):
-                tag.decompose()
-            
-            # 根据text_type筛选内容
-            text_parts = []
-            if text_type == "heading":
-                elements = soup.find_all(['h1', 'h2', 'h3', 'h4', 'h5', 'h6'])
-                if text:  # filter_text
-                    elements = [e for e in elements if text.lower() in e.get_text().lower()]
-            elif text_type == "paragraph":
-                elements = soup.find_all('p')
-                if text:  # filter_text
-                    elements = [e for e in elements if text.lower() in e.get_text().lower()]
-            elif text_type == "span":
-                elements = soup.find_all('span')
-                if text:  # filter_text
-                    elements = [e for e in elements if text.lower() in e.get_text().lower()]
-            
-            for elem in elements:
-                text = elem.get_text(strip=True)
-                if text:  # 只添加非空文本
-                    if text_type == "heading":
-                        text_parts.append(f"{elem.name.upper()}: {text}")
-                    else:
-                        text_parts.append(text)
-            
-            result['text'] = '\n'.join(text_parts)
-            
-        elif content_type == "title":
-            result['title'] = self._driver.title
-            
-        elif content_type == "url":
-            result['url'] = self._driver.current_url
+    def _get_page_content(self, content_type: str = None, selector_type: str = "text", selector_attrs: Optional[Dict] = None, text_type: str = "paragraph", text: Optional[str] = None, limit: int = _DEFAULT_LIMIT, max_chars: int = _DEFAULT_MAX_CHARS) -> Dict[str, Any]:
+        """获取页面内容"""
+        if not self._driver:
+            raise ToolError("浏览器未初始化")
             
+        # 等待页面加载
+        try:
+            self._wait.until(EC.presence_of_element_located((By.TAG_NAME, "body")))
+        except TimeoutException:
+            pass  # 继续处理已加载的内容
+        
+        # 标题、地址和截图直接从浏览器获取，不需要页面HTML
+        if content_type == "title":
+            title, url = self._title_and_url()
+            return {'url': url, 'title': title}
+
+        result = {'url': self._driver.current_url}
+        if content_type == "url":
+            return result
+        if content_type == "screenshot":
+            result['screenshot'] = self._capture_screenshot()
+            return result
+
+        # filter_text只转换一次小写，各内容类型的筛选共用
+        needle = text.lower() if text else None
+
+        if content_type == "media":
+            result['media'] = self._get_media(needle, limit)
+        elif content_type == "text":
+            result['text'] = self._get_text(text_type, needle, max_chars)
         elif content_type == "clickable":
-            # 查找指定类型的元素
-            clickable_elements = []
-            
-            # 处理自定义元素
-            if selector_type == 'custom':
-                if not selector_attrs:
-                    raise ValidationError("使用custom selector_type时必须提供selector_attrs")
-                    
-                # 构建查找条件
-                find_attrs = {}
-                if 'class' in selector_attrs:
-                    find_attrs['class_'] = selector_attrs['class'].split() if isinstance(selector_attrs['class'], str) else selector_attrs['class']
-                for attr, value in selector_attrs.items():
-                    if attr != 'class':
-                        find_attrs[attr] = value
-                        
-                elements = soup.find_all(True, attrs=find_attrs)
-            else:
-                elements = soup.find_all(selector_type)
-                
-            # 如果提供了text参数，筛选包含该文本的元素
-            if text:  # filter_text
-                elements = [e for e in elements if text.lower() in e.get_text(strip=True).lower()]
-            
-            for element in elements:
-                # 获取唯一选择器
-                selector = self._get_unique_selector(
-                    element, 
-                    selector_type,
-                    selector_attrs
-                )
+            result['clickable_elements'], result['truncated'] = self._get_clickable(
+                selector_type, selector_attrs, needle, limit, result['url']
+            )
+        return result
+
+    def _get_text(self, text_type: str, needle: Optional[str], max_chars: int) -> str:
+        """获取指定类型的文字内容，needle为小写的筛选文本"""
+        soup = self._get_soup(text_type)
+        # get_text默认跳过script和style中的字符串，无需先从缓存的解析结果中移除它们
+        # 根据text_type筛选内容
+        text_parts = []
+        # 每个元素的文本只提取一次，筛选和输出共用
+        candidates = [(e, e.get_text(strip=True)) for e in soup.find_all(_TEXT_TAGS[text_type])]
+        if needle:  # filter_text
+            candidates = [(e, t) for e, t in candidates if needle in t.lower()]
+        
+        # 累计字符数(含换行)，超过max_chars时截断并停止提取
+        total_chars = 0
+        # 导航、提示等重复出现的文本只保留第一次
+        seen = set()
+        for elem, text in candidates:
+            if text:  # 只添加非空文本
+                if text_type == "heading":
+                    text = f"{elem.name.upper()}: {text}"
+                if text in seen:
+                    continue
+                seen.add(text)
+                remaining = max_chars - total_chars
+                if len(text) > remaining:
+                    # 只有确实省略了内容时才添加截断提示，没有剩余字符时不添加空行
+                    if remaining > 0:
+                        text_parts.append(text[:remaining])
+                    text_parts.append(f"...(内容已截断，仅显示前{max_chars}个字符)")
+                    break
+                text_parts.append(text)
+                total_chars += len(text) + 1
+        
+        return '\n'.join(text_parts)
+
+    def _get_clickable(
+        self,
+        selector_type: str,
+        selector_attrs: Optional[Dict],
+        needle: Optional[str],
+        limit: int,
+        base_url: str,
+    ) -> Tuple[List[Dict[str, Any]], bool]:
+        """获取可点击元素及其唯一选择器，返回元素信息列表和是否因数量上限被截断"""
+        soup = self._get_soup()
+        # 查找指定类型的元素
+        clickable_elements = []
+        
+        # 处理自定义元素
+        if selector_type == 'custom':
+            if not selector_attrs:
+                raise ValidationError("使用custom selector_type时必须提供selector_attrs")
                 
-                if selector:  # 只添加有唯一选择器的元素
-                    # 收集元素信息
-                    element_info = {
-                        'tag': element.name,
-                        'text': element.get_text(strip=True) or '(无文本)',
-                        'selector': selector,
-                        'attributes': {
-                            'class': element.get('class', []),
-                            'role': element.get('role', ''),
-                            'id': element.get('id', '')
-                        }
-                    }
-                    
-                    # 添加其他重要属性
-                    for attr in ['aria-label', 'data-testid', 'title']:
-                        if value := element.get(attr):
-                            element_info['attributes'][attr] = value
+            # 构建查找条件
+            find_attrs = {}
+            if 'class' in selector_attrs:
+                find_attrs['class_'] = selector_attrs['class'].split() if isinstance(selector_attrs['class'], str) else selector_attrs['class']
+            for attr, value in selector_attrs.items():
+                if attr != 'class':
+                    find_attrs[attr] = value
                     
-                    clickable_elements.append(element_info)
-            result['clickable_elements'] = clickable_elements
+            # id在页面中唯一，找到第一个匹配的元素即可停止遍历
+            elements = soup.find_all(True, attrs=find_attrs, limit=1 if 'id' in find_attrs else None)
+        else:
+            elements = soup.find_all(selector_type)
             
-        elif content_type == "screenshot":
-            screenshot = self._driver.get_screenshot_as_png()
-            result['screenshot'] = base64.b64encode(screenshot).decode()
-            
-        elif content_type == "media":
-            media = {
-                'images': [],
-                'videos': [],
-                'audio': []
-            }
-            # 收集图片信息
-            images = soup.find_all('img')
-            if text:  # filter_text
-                images = [img for img in images if text.lower() in (img.get('alt', '').lower() or img.get('title', '').lower())]
-            for img in images:
-                img_info = {
-                    'src': img.get('src', ''),
-                    'alt': img.get('alt', ''),
-                    'width': img.get('width', ''),
-                    'height': img.get('height', '')
-                }
-                media['images'].append(img_info)
+        # 每个元素的文本只提取一次，筛选和输出共用
+        candidates = [(e, e.get_text(strip=True)) for e in elements]
+        
+        # 如果提供了text参数，筛选包含该文本的元素
+        if needle:  # filter_text
+            candidates = [(e, t) for e, t in candidates if needle in t.lower()]
+        
+        # 同一父元素下的同级序号只计算一次
+        position_cache = {}
+        # 选择器和文本都相同的元素对调用方没有区别，只保留第一个
+        seen = set()
+        truncated = False
+        for element, element_text in candidates:
+            # 获取唯一选择器
+            selector = self._get_unique_selector(
+                element, 
+                selector_type,
+                selector_attrs,
+                position_cache,
+                base_url
+            )
             
-            # 收集视频信息    
-            videos = soup.find_all(['video', 'iframe'])
-            if text:  # filter_text
-                videos = [v for v in videos if text.lower() in (v.get('title', '').lower() or v.get('aria-label', '').lower())]
-            for video in videos:
-                video_info = {
-                    'src': video.get('src', ''),
-                    'type': video.name,
-                    'width': video.get('width', ''),
-                    'height': video.get('height', '')
+            if selector and (selector, element_text) not in seen:  # 只添加有唯一选择器的元素
+                if len(clickable_elements) >= limit:
+                    # 达到上限后仍有可以输出的元素，才说明结果被截断
+                    truncated = True
+                    break
+                seen.add((selector, element_text))
+                # 收集元素信息
+                attrs = element.attrs
+                element_info = {
+                    'tag': element.name,
+                    'text': element_text or '(无文本)',
+                    'selector': selector,
+                    'attributes': {
+                        'class': attrs.get('class', []),
+                        'role': attrs.get('role', ''),
+                        'id': attrs.get('id', '')
+                    }
                 }
-                media['videos'].append(video_info)
                 
-            # 收集音频信息
-            audios = soup.find_all('audio')
-            if text:  # filter_text
-                audios = [a for a in audios if text.lower() in (a.get('title', '').lower() or a.get('aria-label', '').lower())]
-            for audio in audios:
-                audio_info = {
-                    'src': audio.get('src', ''),
-                    'type': audio.get('type', '')
-                }
-                media['audio'].append(audio_info)
+                # 添加其他重要属性
+                for attr in ('aria-label', 'data-testid', 'title'):
+                    if value := attrs.get(attr):
+                        element_info['attributes'][attr] = value
                 
-            result['media'] = media
-            
-        return result
+                clickable_elements.append(element_info)
+        return clickable_elements, truncated
+
+    def _get_media(self, needle: Optional[str], limit: int) -> Dict[str, List[Dict[str, str]]]:
+        """在浏览器中直接读取媒体元素的属性，不需要获取和解析整个页面的HTML，needle为小写的筛选文本"""
+        images, videos, audios = self._driver.execute_script(_MEDIA_SCRIPT)
+        if needle:  # filter_text
+            images = [img for img in images if needle in (img['alt'].lower() or img['title'].lower())]
+            videos = [v for v in videos if needle in (v['title'].lower() or v['aria-label'].lower())]
+            audios = [a for a in audios if needle in (a['title'].lower() or a['aria-label'].lower())]
+        return {
+            'images': [
+                {'src': img['src'], 'alt': img['alt'], 'width': img['width'], 'height': img['height']}
+                for img in images[:limit]
+            ],
+            'videos': [
+                {'src': v['src'], 'type': v['tag'], 'width': v['width'], 'height': v['height']}
+                for v in videos[:limit]
+            ],
+            'audio': [{'src': a['src'], 'type': a['type']} for a in audios[:limit]],
+        }
 
     async def execute(self, **kwargs) -> ToolResult:
-        """执行浏览器操作"""
+        """执行浏览器操作，同一浏览器上的操作依次执行，避免互相干扰页面状态"""
+        await self._ensure_browser()
+        driver = self._driver
+        async with self._lock:
+            try:
+                # Selenium调用是阻塞的，放到线程中执行以免阻塞事件循环
+                return await asyncio.get_running_loop().run_in_executor(
+                    _BROWSER_EXECUTOR, partial(self._execute_action, **kwargs)
+                )
+            finally:
+                if self._driver is None:
+                    self._forget_browser(driver)
+
+    def _execute_action(self, **kwargs) -> ToolResult:
+        """执行单个浏览器操作"""
         action = kwargs.get("action")
         if not action:
             raise ValidationError("未指定操作类型")
 
         try:
-            await self._ensure_browser()
+            if action != "get_content":
+                # 页面可能被操作改变，丢弃解析缓存
+                self._soup_cache = None
 
             if action == "visit":
+                urls = kwargs.get("urls")
+                if urls:
+                    return ToolResult(output=self._visit_many(urls))
                 url = kwargs.get("url")
                 if not url:
                     raise ValidationError("未指定URL")
@@ -428,7 +681,9 @@ class BrowserTool(BaseTool):
                     selector_type=kwargs.get("selector_type", "text"),
                     selector_attrs=kwargs.get('selector_attrs', {}),                    
                     text_type=kwargs.get("text_type", "paragraph"),
-                    text=kwargs.get("filter_text")  # 传入filter_text参数用于内容筛选
+                    text=kwargs.get("filter_text"),  # 传入filter_text参数用于内容筛选
+                    limit=kwargs.get("limit", _DEFAULT_LIMIT),
+                    max_chars=kwargs.get("max_chars", _DEFAULT_MAX_CHARS)
                 )
                 
                 if content_type == "text":
@@ -445,10 +700,12 @@ class BrowserTool(BaseTool):
                     
                 elif content_type == "clickable":
                     elements = content['clickable_elements']
-                    output = []
-                    for i, elem in enumerate(elements, 1):
-                        output.append(f"{i}. {elem['text']} ({elem['tag']})")
-                        output.append(f"   选择器: {elem['selector']}")
+                    output = [
+                        f"{i}. {elem['text']} ({elem['tag']})\n   选择器: {elem['selector']}"
+                        for i, elem in enumerate(elements, 1)
+                    ]
+                    if content['truncated']:
+                        output.append(f"...(仅显示前{len(elements)}个元素，可通过filter_text缩小范围)")
                     result = ToolResult(output='\n'.join(output))
                     return result
                     
@@ -494,10 +751,8 @@ class BrowserTool(BaseTool):
                 if selector.startswith('a') and '[href=' in selector:
                     try:
                         # 使用正则表达式提取href值
-                        import re
-                        from urllib.parse import urljoin
-                        href_match = re.search(r"\[href='([^']+)'\]", selector)
-                        href = href_match.group(1) if href_match else None
+                        href_match = _HREF_PATTERN.search(selector)
+                        href = _CSS_UNESCAPE.sub(r"\1", href_match.group(1)) if href_match else None
                         if href:
                             # 使用当前页面URL作为基础来解析相对链接
                             base_url = self._driver.current_url
@@ -511,7 +766,7 @@ class BrowserTool(BaseTool):
                 
                 # 如果提供了text参数，在指定类型的元素中查找包含该文本的元素
                 if text:
-                    soup = BeautifulSoup(self._driver.page_source, 'html.parser')
+                    soup = BeautifulSoup(self._driver.page_source, _HTML_PARSER)
                     selector_type = kwargs.get("selector_type")
                     selector_attrs = kwargs.get("selector_attrs", {})
                     
@@ -531,13 +786,13 @@ class BrowserTool(BaseTool):
                             if attr != 'class':
                                 find_attrs[attr] = value
                                 
-                        elements = soup.find_all(True, attrs=find_attrs)
+                        elements = soup.find_all(True, attrs=find_attrs, limit=1 if 'id' in find_attrs else None)
                     else:
                         # 查找常规元素
                         elements = soup.find_all(selector_type)
                         
                     # 筛选包含文本的元素
-                    elements = [e for e in elements if text.lower() in e.get_text(strip=True).lower()]
+                    elements = _filter_by_text(elements, text)
                     
                     if elements:
                         element = elements[0]
@@ -560,8 +815,8 @@ class BrowserTool(BaseTool):
                     raise ToolError(f"未找到可点击的元素: {selector}")
                 
                 element.click()
-                title = self._driver.title
-                result = ToolResult(output=f"点击后跳转到: {title}\nURL: {self._driver.current_url}")
+                title, url = self._title_and_url()
+                result = ToolResult(output=f"点击后跳转到: {title}\nURL: {url}")
                 return result
 
             elif action == "type":
@@ -573,7 +828,10 @@ class BrowserTool(BaseTool):
                     raise ValidationError("未指定要输入的input_text内容")
 
                 try:
-                    element = self._wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, selector)))
+                    # 输入框不可能按链接文本匹配，只按XPath或CSS选择器查找
+                    element = self._wait.until(
+                        EC.presence_of_element_located(_locator(selector, link_text=False))
+                    )
                     if not element:
                         raise ToolError(f"未找到文本输入框元素: {selector}")
                     
@@ -584,6 +842,8 @@ class BrowserTool(BaseTool):
                     return result
                 except TimeoutException:
                     raise ToolError(f"等待文本输入框元素超时: {selector}")
+                except InvalidSelectorException:
+                    raise ToolError(f"无效的元素选择器: {selector}")
                 except Exception as e:
                     raise ToolError(f"文本输入操作失败: {str(e)}")
 
@@ -592,17 +852,112 @@ class BrowserTool(BaseTool):
                     raise ToolError("浏览器未访问任何页面")
                 
                 self._driver.back()
-                title = self._driver.title
-                result = ToolResult(output=f"返回到页面: {title}\nURL: {self._driver.current_url}")
+                title, url = self._title_and_url()
+                result = ToolResult(output=f"返回到页面: {title}\nURL: {url}")
                 return result
 
             else:
                 raise ValidationError(f"不支持的操作类型: {action}")
 
+        except WebDriverException as e:
+            # 只有浏览器会话失效时才丢弃驱动，下次调用重新启动；其他错误保留浏览器状态
+            if not isinstance(e, (TimeoutException, NoSuchElementException)) and not self._is_session_alive():
+                self._drop_driver()
+            raise ToolError(f"浏览器操作失败: {str(e)}")
         except Exception as e:
             # 发生异常时不自动关闭浏览器，让用户可以查看状态
             raise ToolError(f"浏览器操作失败: {str(e)}")
 
+    def _capture_screenshot(self) -> str:
+        """截取当前页面，返回base64编码的图片，优先通过CDP直接获取JPEG"""
+        try:
+            # JPEG比无损PNG小得多且足够模型识别页面内容；只截取可见区域
+            return self._driver.execute_cdp_cmd('Page.captureScreenshot', {
+                'format': 'jpeg',
+                'quality': self.config.browser.SCREENSHOT_QUALITY,
+                'captureBeyondViewport': False,
+            })['data']
+        except WebDriverException:
+            # 不支持CDP时退回WebDriver截图(PNG)，协议本身以base64传输，直接使用避免解码后再编码
+            return self._driver.get_screenshot_as_base64()
+
+    def _title_and_url(self) -> Tuple[str, str]:
+        """一次脚本调用同时获取当前页面的标题和地址"""
+        title, url = self._driver.execute_script("return [document.title, document.URL];")
+        return title, url
+
+    def _visit_many(self, urls: List[str]) -> str:
+        """在新标签页中并行打开多个网页，读取标题后关闭这些标签页"""
+        driver = self._driver
+        origin = driver.current_window_handle
+        lines = []
+        try:
+            for start in range(0, len(urls), _MAX_PARALLEL_TABS):
+                batch = urls[start:start + _MAX_PARALLEL_TABS]
+                # window.open立即返回，各标签页由浏览器同时加载；
+                # window_handles的顺序不一定与打开顺序一致，每打开一个就记录新增的句柄
+                handles = []
+                known = set(driver.window_handles)
+                for url in batch:
+                    driver.execute_script("window.open(arguments[0], '_blank');", url)
+                    current = driver.window_handles
+                    opened = [handle for handle in current if handle not in known]
+                    known.update(current)
+                    handles.append(opened[0] if opened else None)
+                for requested, handle in zip(batch, handles):
+                    if handle is None:
+                        lines.append(f"无法打开页面: {requested}\n原因: 新标签页未能打开，可能被浏览器拦截")
+                        continue
+                    driver.switch_to.window(handle)
+                    try:
+                        # window.open返回后新标签页可能仍停留在about:blank，需等到目标地址开始加载
+                        self._wait.until(lambda d: d.execute_script(_TAB_READY_SCRIPT))
+                    except TimeoutException:
+                        pass  # 使用已加载的内容
+                    title, url = self._title_and_url()
+                    lines.append(f"已访问页面: {title}\nURL: {url}")
+                    driver.close()
+        finally:
+            driver.switch_to.window(origin)
+        return '\n\n'.join(lines)
+
+    def _is_session_alive(self) -> bool:
+        """检查浏览器会话是否仍然可用"""
+        if not self._driver:
+            return False
+        try:
+            self._driver.window_handles
+            return True
+        except WebDriverException:
+            return False
+
+    def _drop_driver(self) -> None:
+        """丢弃已失效的浏览器驱动"""
+        driver = self._driver
+        self._driver = None
+        self._wait = None
+        self._fast_wait = None
+        self._soup_cache = None
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+    def _forget_browser(self, driver: webdriver.Edge) -> None:
+        """从session_state中移除已丢弃的浏览器，需在脚本线程中调用"""
+        import streamlit as st
+
+        if hasattr(st, 'session_state') and 'browser_instance' in st.session_state:
+            instance = st.session_state.browser_instance
+            if instance is self or (instance and instance._driver is driver):
+                st.session_state.browser_instance = None
+
+    def clean_session(self) -> None:
+        """清除浏览器cookies，无需重启浏览器即可重置会话状态"""
+        if self._driver:
+            self._driver.delete_all_cookies()
+            self._soup_cache = None
+
     async def close(self, force: bool = False) -> None:
         """关闭浏览器
         
@@ -614,115 +969,159 @@ class BrowserTool(BaseTool):
             self._driver = None
 
     async def validate_params(self, **kwargs) -> None:
-        """验证参数"""
-        action = kwargs.get("action")
-        if not action:
-            raise ValidationError("未指定操作类型")
+        """验证参数，相同的参数组合只完整验证一次"""
+        try:
+            # 参数值的类型也作为键的一部分，避免True和1等相等的值共用验证结果
+            key = tuple(sorted((name, type(value), value) for name, value in kwargs.items()))
+            hash(key)
+        except TypeError:
+            # 包含列表、字典等不可哈希的参数值时直接验证
+            _validate(kwargs)
+        else:
+            _validate_cached(key)
+
+
+# 每个action的必需参数，按验证顺序排列
+_REQUIRED = {
+    "get_content": ("content_type",),
+    "type": ("selector", "input_text"),
+}
+
+# 参数的可选值
+_VALID_CONTENT_TYPES = frozenset({"text", "title", "url", "clickable", "screenshot", "media"})
+_VALID_SELECTOR_TYPES = frozenset({"a", "div", "custom"})
+_VALID_TEXT_TYPES = frozenset({"heading", "paragraph", "span"})
+
+# 每个action允许的参数
+_ALLOWED_PARAMS = {
+    "visit": frozenset({"action", "url", "urls"}),
+    "get_content": frozenset({
+        "action", "content_type", "selector_type", "selector_attrs", 
+        "text_type", "filter_text", "limit", "max_chars"
+    }),
+    "click": frozenset({
+        "action", "selector", "target_text", "selector_type", 
+        "selector_attrs"
+    }),
+    "back": frozenset({"action"}),
+    "type": frozenset({"action", "selector", "input_text"}),
+}
+
+def _validate(kwargs: Dict[str, Any]) -> None:
+    """验证浏览器操作的参数"""
+    action = kwargs.get("action")
+    if not action:
+        raise ValidationError("未指定操作类型")
+    
+    validator = _VALIDATORS.get(action)
+    if validator is None:
+        raise ValidationError(f"不支持的操作类型: {action}")
+
+    # 检查是否存在不允许的参数
+    invalid_params = kwargs.keys() - _ALLOWED_PARAMS[action]
+    if invalid_params:
+        raise ValidationError(f"{action}操作不支持以下参数: {', '.join(invalid_params)}")
+
+    # 验证必需参数，值为空也视为未指定
+    for name in _REQUIRED.get(action, ()):
+        if not kwargs.get(name):
+            raise ValidationError(f"{action}操作需要指定{name}参数")
+
+    # 验证action相关的参数组合
+    validator(kwargs)
+
+@lru_cache(maxsize=256)
+def _validate_cached(key: Tuple[Tuple[str, type, Any], ...]) -> None:
+    """验证可哈希的参数组合，验证通过的组合被缓存，验证失败时异常不会被缓存"""
+    _validate({name: value for name, _, value in key})
+
+def _validate_selector_type(selector_type: str, kwargs: Dict[str, Any]) -> None:
+    """验证selector_type及与之对应的selector_attrs，get_content和click操作共用"""
+    if selector_type not in _VALID_SELECTOR_TYPES:
+        raise ValidationError(f"不支持的元素类型: {selector_type}")
         
-        valid_actions = ["visit", "get_content", "click", "back", "type"]
-        if action not in valid_actions:
-            raise ValidationError(f"不支持的操作类型: {action}")
-
-        # 定义每个action允许的参数
-        allowed_params = {
-            "visit": {"action", "url"},
-            "get_content": {
-                "action", "content_type", "selector_type", "selector_attrs", 
-                "text_type", "filter_text"
-            },
-            "click": {
-                "action", "selector", "target_text", "selector_type", 
-                "selector_attrs"
-            },
-            "back": {"action"},
-            "type": {"action", "selector", "input_text"}
-        }
+    # 只有custom类型使用selector_attrs，且必须提供
+    if selector_type == "custom":
+        if not kwargs.get("selector_attrs"):
+            raise ValidationError("selector_type为custom时必须提供selector_attrs参数")
+    elif "selector_attrs" in kwargs:
+        raise ValidationError(f"selector_type为{selector_type}时不应提供selector_attrs参数")
 
-        # 检查是否存在不允许的参数
-        provided_params = set(kwargs.keys())
-        invalid_params = provided_params - allowed_params[action]
-        if invalid_params:
-            raise ValidationError(f"{action}操作不支持以下参数: {', '.join(invalid_params)}")
+def _validate_visit(kwargs: Dict[str, Any]) -> None:
+    """验证visit操作的参数"""
+    urls = kwargs.get("urls")
+    if not kwargs.get("url") and not urls:
+        raise ValidationError("visit操作需要指定url或urls参数")
+    if kwargs.get("url") and urls:
+        raise ValidationError("url和urls参数不能同时提供")
+    if urls is not None and (
+        not isinstance(urls, list) or not all(isinstance(url, str) and url for url in urls)
+    ):
+        raise ValidationError("urls参数必须是非空字符串列表")
+
+def _validate_get_content(kwargs: Dict[str, Any]) -> None:
+    """验证get_content操作的参数"""
+    content_type = kwargs["content_type"]
+    if content_type not in _VALID_CONTENT_TYPES:
+        raise ValidationError(f"不支持的内容类型: {content_type}")
 
-        # 验证action相关的必需参数和参数组合
-        if action == "visit":
-            if not kwargs.get("url"):
-                raise ValidationError("visit操作需要指定url参数")
+    for param in ("limit", "max_chars"):
+        value = kwargs.get(param)
+        if value is not None and (
+            not isinstance(value, int) or isinstance(value, bool) or value <= 0
+        ):
+            raise ValidationError(f"{param}参数必须是正整数")
         
-        elif action == "get_content":
-            content_type = kwargs.get("content_type")
-            if not content_type:
-                raise ValidationError("get_content操作需要指定content_type参数")
-                
-            valid_content_types = ["text", "title", "url", "clickable", "screenshot", 
-                                 "media"]
-            if content_type not in valid_content_types:
-                raise ValidationError(f"不支持的内容类型: {content_type}")
-                
-            # 验证content_type相关的参数组合
-            if content_type == "text":
-                text_type = kwargs.get("text_type")
-                if not text_type:
-                    raise ValidationError("content_type为text时必须指定text_type参数")
-                    
-                valid_text_types = ["heading", "paragraph", "span"]
-                if text_type not in valid_text_types:
-                    raise ValidationError(f"不支持的文本类型: {text_type}")
-                    
-                # text类型不应该有selector_type和selector_attrs
-                if "selector_type" in kwargs or "selector_attrs" in kwargs:
-                    raise ValidationError("content_type为text时不应指定selector_type或selector_attrs参数")
-                    
-            elif content_type == "clickable":
-                selector_type = kwargs.get("selector_type")
-                if not selector_type:
-                    raise ValidationError("content_type为clickable时必须指定selector_type参数")
-                    
-                valid_selector_types = ["a", "div", "custom"]
-                if selector_type not in valid_selector_types:
-                    raise ValidationError(f"不支持的元素类型: {selector_type}")
-                    
-                # 验证selector_type相关的参数
-                if selector_type == "custom":
-                    if not kwargs.get("selector_attrs"):
-                        raise ValidationError("selector_type为custom时必须提供selector_attrs参数")
-                elif "selector_attrs" in kwargs:
-                    raise ValidationError(f"selector_type为{selector_type}时不应提供selector_attrs参数")
-                    
-                # clickable类型不应该有text_type
-                if "text_type" in kwargs:
-                    raise ValidationError("content_type为clickable时不应指定text_type参数")
-                    
-            elif content_type in ["title", "url", "screenshot"]:
-                # 这些类型不需要额外参数
-                invalid_params = {"selector_type", "selector_attrs", "text_type"} & provided_params
-                if invalid_params:
-                    raise ValidationError(f"content_type为{content_type}时不应指定以下参数: {', '.join(invalid_params)}")
-                    
-        elif action == "click":
-            # 验证click操作的两种互斥参数组合
-            has_selector = "selector" in kwargs
-            has_text_selector = "target_text" in kwargs and "selector_type" in kwargs
+    # 验证content_type相关的参数组合
+    if content_type == "text":
+        text_type = kwargs.get("text_type")
+        if not text_type:
+            raise ValidationError("content_type为text时必须指定text_type参数")
+        if text_type not in _VALID_TEXT_TYPES:
+            raise ValidationError(f"不支持的文本类型: {text_type}")
             
-            if not has_selector and not has_text_selector:
-                raise ValidationError("click操作需要指定selector参数或同时指定target_text和selector_type参数")
-            if has_selector and has_text_selector:
-                raise ValidationError("click操作不能同时指定selector和(target_text, selector_type)参数组合")
-                
-            if has_text_selector:
-                selector_type = kwargs["selector_type"]
-                valid_selector_types = ["a", "div", "custom"]
-                if selector_type not in valid_selector_types:
-                    raise ValidationError(f"不支持的元素类型: {selector_type}")
-                    
-                if selector_type == "custom":
-                    if not kwargs.get("selector_attrs"):
-                        raise ValidationError("selector_type为custom时必须提供selector_attrs参数")
-                elif "selector_attrs" in kwargs:
-                    raise ValidationError(f"selector_type为{selector_type}时不应提供selector_attrs参数")
-                    
-        elif action == "type":
-            if not kwargs.get("selector"):
-                raise ValidationError("type操作需要指定selector参数")
-            if not kwargs.get("input_text"):
-                raise ValidationError("type操作需要指定input_text参数")
+        # text类型不应该有selector_type和selector_attrs
+        if "selector_type" in kwargs or "selector_attrs" in kwargs:
+            raise ValidationError("content_type为text时不应指定selector_type或selector_attrs参数")
+            
+    elif content_type == "clickable":
+        selector_type = kwargs.get("selector_type")
+        if not selector_type:
+            raise ValidationError("content_type为clickable时必须指定selector_type参数")
+        _validate_selector_type(selector_type, kwargs)
+            
+        # clickable类型不应该有text_type
+        if "text_type" in kwargs:
+            raise ValidationError("content_type为clickable时不应指定text_type参数")
+            
+    elif content_type in ("title", "url", "screenshot"):
+        # 这些类型不需要额外参数
+        invalid_params = {"selector_type", "selector_attrs", "text_type"} & kwargs.keys()
+        if invalid_params:
+            raise ValidationError(f"content_type为{content_type}时不应指定以下参数: {', '.join(invalid_params)}")
+
+def _validate_click(kwargs: Dict[str, Any]) -> None:
+    """验证click操作的参数"""
+    # 验证click操作的两种互斥参数组合
+    has_selector = "selector" in kwargs
+    has_text_selector = "target_text" in kwargs and "selector_type" in kwargs
+    
+    if not has_selector and not has_text_selector:
+        raise ValidationError("click操作需要指定selector参数或同时指定target_text和selector_type参数")
+    if has_selector and has_text_selector:
+        raise ValidationError("click操作不能同时指定selector和(target_text, selector_type)参数组合")
+        
+    if has_text_selector:
+        _validate_selector_type(kwargs["selector_type"], kwargs)
+
+def _validate_nothing(kwargs: Dict[str, Any]) -> None:
+    """没有必需参数以外的参数组合需要验证"""
+
+# 各action对应的参数验证函数，同时作为支持的action集合
+_VALIDATORS = {
+    "visit": _validate_visit,
+    "get_content": _validate_get_content,
+    "click": _validate_click,
+    "back": _validate_nothing,
+    "type": _validate_nothing,
+}
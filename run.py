@@ -1,7 +1,6 @@
 """启动Streamlit应用程序的脚本"""
 
-import anyio
-from computer_use_demo.streamlit import main
+from computer_use_demo.streamlit import run_app
 
 if __name__ == "__main__":
-    anyio.run(main, backend="asyncio")
+    run_app()
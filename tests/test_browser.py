@@ -0,0 +1,234 @@
+"""浏览器工具中不依赖真实浏览器的逻辑的测试"""
+
+import asyncio
+
+import pytest
+from selenium.common.exceptions import InvalidSelectorException
+from selenium.webdriver.common.by import By
+
+from computer_use_demo.tools import browser
+from computer_use_demo.tools.browser import BrowserTool, _css_id, _css_literal, _locator
+from computer_use_demo.tools.exceptions import ToolError, ValidationError
+
+
+class _StubDriver:
+    """只返回固定页面HTML，按(定位方式, 选择器)返回预设元素的驱动"""
+
+    def __init__(self, html="<html><body></body></html>", elements=None):
+        self.html = html
+        self.elements = elements or {}
+
+    def execute_script(self, script, *args):
+        # _fetch_page获取页面HTML，_PREPARE_CLICK_SCRIPT返回元素是否可用
+        return self.html if "outerHTML" in script else True
+
+    def find_element(self, by, value):
+        elements = self.find_elements(by, value)
+        if not elements:
+            raise browser.NoSuchElementException()
+        return elements[0]
+
+    def find_elements(self, by, value):
+        result = self.elements.get((by, value), [])
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+
+class _NoWait:
+    """立即检查一次条件的WebDriverWait替身"""
+
+    def __init__(self, driver):
+        self._driver = driver
+
+    def until(self, condition):
+        result = condition(self._driver)
+        if not result:
+            raise browser.TimeoutException()
+        return result
+
+
+def _tool(driver):
+    tool = BrowserTool.__new__(BrowserTool)
+    tool._driver = driver
+    tool._wait = tool._fast_wait = _NoWait(driver)
+    tool._soup_cache = None
+    return tool
+
+
+def _page(body):
+    return f"<html><body>{body}</body></html>"
+
+
+def _links(count):
+    return "".join(f'<a href="/p{i}">链接{i}</a>' for i in range(count))
+
+
+def test_clickable_skips_element_without_selector(monkeypatch):
+    # 无法生成选择器的元素不应被加入结果，也不应重复加入上一个元素的信息
+    original = BrowserTool._get_unique_selector
+
+    def unique_selector(self, element, *args, **kwargs):
+        if not element.attrs:
+            return None
+        return original(self, element, *args, **kwargs)
+
+    monkeypatch.setattr(BrowserTool, "_get_unique_selector", unique_selector)
+    tool = _tool(_StubDriver(_page("<a>无属性</a>" + _links(10))))
+
+    elements, truncated = tool._get_clickable("a", None, None, 50, "https://example.com/")
+
+    assert len(elements) == 10
+    assert len({e["selector"] for e in elements}) == 10
+    assert not truncated
+
+
+def test_clickable_keeps_one_of_identical_elements():
+    tool = _tool(_StubDriver(_page('<a href="/x">同一个</a>' * 3 + _links(2))))
+
+    elements, _ = tool._get_clickable("a", None, None, 50, "https://example.com/")
+
+    assert [e["text"] for e in elements] == ["同一个", "链接0", "链接1"]
+
+
+@pytest.mark.parametrize("limit, expected", [(2, True), (3, False), (4, False)])
+def test_clickable_truncated_only_when_elements_dropped(limit, expected):
+    tool = _tool(_StubDriver(_page(_links(3))))
+
+    elements, truncated = tool._get_clickable("a", None, None, limit, "https://example.com/")
+
+    assert len(elements) == min(limit, 3)
+    assert truncated is expected
+
+
+@pytest.mark.parametrize("max_chars, expected", [
+    (11, "abcde\nfghij"),
+    (6, "abcde\n...(内容已截断，仅显示前6个字符)"),
+    (10, "abcde\nfghi\n...(内容已截断，仅显示前10个字符)"),
+])
+def test_text_truncation(max_chars, expected):
+    tool = _tool(_StubDriver(_page("<p>abcde</p><p>fghij</p><p>abcde</p>")))
+
+    assert tool._get_text("paragraph", None, max_chars) == expected
+
+
+def test_css_literal_escapes_quotes_backslashes_and_newlines():
+    assert _css_literal("it's") == r"'it\'s'"
+    assert _css_literal("a\\b") == r"'a\\b'"
+    assert _css_literal("a\nb") == "'a\\a b'"
+
+
+def test_css_id_uses_attribute_selector_for_invalid_identifiers():
+    assert _css_id("main") == "#main"
+    assert _css_id("1st") == "[id='1st']"
+    assert _css_id("a'b") == r"[id='a\'b']"
+
+
+@pytest.mark.parametrize("selector, by", [
+    ("//button", By.XPATH),
+    ("./a", By.XPATH),
+    ("(//a)[2]", By.XPATH),
+    ("#submit", By.CSS_SELECTOR),
+    ("a[href='/x']", By.CSS_SELECTOR),
+    ("button", By.CSS_SELECTOR),
+    ("登录", By.LINK_TEXT),
+])
+def test_locator_classification(selector, by):
+    assert _locator(selector) == (by, selector)
+
+
+def test_locator_without_link_text_treats_text_as_css():
+    assert _locator("登录", link_text=False) == (By.CSS_SELECTOR, "登录")
+    assert _locator("//input", link_text=False) == (By.XPATH, "//input")
+
+
+def test_type_reports_invalid_selector_immediately():
+    driver = _StubDriver(elements={(By.CSS_SELECTOR, "登录"): InvalidSelectorException()})
+
+    with pytest.raises(ToolError, match="无效的元素选择器"):
+        _tool(driver)._execute_action(action="type", selector="登录", input_text="用户")
+
+
+def test_click_falls_back_to_link_text():
+    driver = _StubDriver(elements={(By.LINK_TEXT, "Login"): ["登录链接"]})
+
+    assert _tool(driver)._find_clickable_element("Login") == "登录链接"
+
+
+def test_click_falls_back_to_link_text_for_invalid_css():
+    driver = _StubDriver(elements={
+        (By.CSS_SELECTOR, "Next >"): InvalidSelectorException(),
+        (By.LINK_TEXT, "Next >"): ["下一页"],
+    })
+
+    assert _tool(driver)._find_clickable_element("Next >") == "下一页"
+
+
+def test_click_invalid_xpath_is_not_found():
+    driver = _StubDriver(elements={(By.XPATH, "//["): InvalidSelectorException()})
+
+    assert _tool(driver)._find_clickable_element("//[") is None
+
+
+class _TabDriver:
+    """window_handles按与打开顺序相反的顺序返回，blocked中的地址无法打开新标签页"""
+
+    def __init__(self, blocked=()):
+        self.blocked = set(blocked)
+        self.tabs = {"origin": "about:blank"}
+        self.current_window_handle = "origin"
+        self.switch_to = self
+
+    @property
+    def window_handles(self):
+        return list(reversed(self.tabs))
+
+    def window(self, handle):
+        self.current_window_handle = handle
+
+    def execute_script(self, script, *args):
+        if script.startswith("window.open"):
+            if args[0] not in self.blocked:
+                self.tabs[f"tab{len(self.tabs)}"] = args[0]
+            return None
+        url = self.tabs[self.current_window_handle]
+        if "readyState" in script:
+            return True
+        return [f"标题 {url}", url]
+
+    def close(self):
+        del self.tabs[self.current_window_handle]
+
+
+def test_visit_many_reports_in_input_order_and_blocked_tabs():
+    driver = _TabDriver(blocked={"https://b.example/"})
+    urls = ["https://a.example/", "https://b.example/", "https://c.example/"]
+
+    output = _tool(driver)._visit_many(urls).split("\n\n")
+
+    assert output[0].endswith("URL: https://a.example/")
+    assert output[1].startswith("无法打开页面: https://b.example/")
+    assert output[2].endswith("URL: https://c.example/")
+    assert list(driver.tabs) == ["origin"]
+    assert driver.current_window_handle == "origin"
+
+
+def test_validation_caches_only_valid_parameters():
+    tool = _tool(None)
+    browser._validate_cached.cache_clear()
+
+    asyncio.run(tool.validate_params(action="visit", url="https://example.com"))
+    asyncio.run(tool.validate_params(action="visit", url="https://example.com"))
+    assert browser._validate_cached.cache_info().hits == 1
+
+    for _ in range(2):
+        with pytest.raises(ValidationError):
+            asyncio.run(tool.validate_params(action="visit"))
+    assert browser._validate_cached.cache_info().currsize == 1
+
+
+def test_visit_rejects_url_with_urls():
+    with pytest.raises(ToolError):
+        asyncio.run(_tool(None).validate_params(
+            action="visit", url="https://a.example", urls=["https://b.example"]
+        ))
@@ -0,0 +1,58 @@
+"""采样循环中图片存储和图片过滤的测试"""
+
+from computer_use_demo.loop import _filter_recent_images, _intern_images
+
+
+def _image(data):
+    return {"type": "image_url", "image_url": {"url": f"data:image/png;base64,{data}"}}
+
+
+def _screenshot(data, image_store):
+    return {"role": "user", "content": _intern_images([{"type": "text", "text": "截图"}, _image(data)], image_store)}
+
+
+def test_intern_images_replaces_images_with_shared_references():
+    image_store = {}
+    first = _intern_images([{"type": "text", "text": "a"}, _image("AAAA")], image_store)
+    second = _intern_images([_image("AAAA")], image_store)
+
+    assert first[0] == {"type": "text", "text": "a"}
+    assert first[1]["type"] == "image_ref"
+    assert first[1] == second[0]
+    assert list(image_store.values()) == ["data:image/png;base64,AAAA"]
+
+
+def test_filter_keeps_most_recent_images_and_releases_the_rest():
+    image_store = {}
+    history = [
+        {"role": "user", "content": "开始"},
+        _screenshot("AAAA", image_store),
+        _screenshot("BBBB", image_store),
+        _screenshot("CCCC", image_store),
+    ]
+    snapshot = [dict(message) for message in history]
+
+    messages = _filter_recent_images(history, 2, image_store)
+
+    urls = [
+        block["image_url"]["url"]
+        for message in messages if isinstance(message["content"], list)
+        for block in message["content"] if block["type"] == "image_url"
+    ]
+    assert urls == ["data:image/png;base64,BBBB", "data:image/png;base64,CCCC"]
+    # 最旧的截图只剩文本，文本消息原样复用
+    assert messages[1]["content"] == [{"type": "text", "text": "截图"}]
+    assert messages[0] is history[0]
+    # 不修改持久化的历史，不再发送的图片从存储中移除
+    assert history == snapshot
+    assert sorted(image_store.values()) == urls
+
+
+def test_filter_keeps_all_images_when_limit_is_not_positive():
+    image_store = {}
+    history = [_screenshot("AAAA", image_store), _screenshot("BBBB", image_store)]
+
+    messages = _filter_recent_images(history, 0, image_store)
+
+    assert [message["content"][1]["type"] for message in messages] == ["image_url", "image_url"]
+    assert len(image_store) == 2
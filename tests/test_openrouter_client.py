@@ -0,0 +1,81 @@
+"""OpenRouter客户端消息验证缓存的测试"""
+
+import asyncio
+
+import httpx
+import pytest
+
+from computer_use_demo import openrouter_client
+from computer_use_demo.loop import _filter_recent_images, _intern_images
+from computer_use_demo.openrouter_client import OpenrouterClient
+
+_RESPONSE = {
+    "choices": [{"message": {"role": "assistant", "content": "ok"}, "finish_reason": "stop"}],
+    "usage": {"prompt_tokens": 1, "completion_tokens": 1},
+}
+
+
+@pytest.fixture
+def client(monkeypatch):
+    real_client = httpx.AsyncClient
+    transport = httpx.MockTransport(lambda request: httpx.Response(200, json=_RESPONSE))
+    monkeypatch.setattr(
+        openrouter_client.httpx, "AsyncClient",
+        lambda **kwargs: real_client(transport=transport, **kwargs),
+    )
+    return OpenrouterClient(base_url="https://example.invalid", api_key="key", model="model")
+
+
+def _screenshot_turn(image_store):
+    """模拟一轮工具调用: 助手消息、工具结果和带截图的用户消息"""
+    content = [
+        {"type": "text", "text": "截图"},
+        {"type": "image_url", "image_url": {"url": "data:image/png;base64,AAAA"}},
+    ]
+    return [
+        {"role": "assistant", "content": "", "tool_calls": []},
+        {"role": "tool", "name": "computer", "tool_call_id": "1", "content": "[]"},
+        {"role": "user", "content": _intern_images(content, image_store)},
+    ]
+
+
+def _turn(client, history, image_store):
+    """与sampling_loop相同: 每轮重新构建请求消息，以持久化的历史作为验证依据"""
+    request_messages = _filter_recent_images(history, 5, image_store)
+    assert request_messages[-1] is not history[-1]
+    asyncio.run(client.beta.messages.create(
+        max_tokens=16, messages=request_messages, system=[], history=history
+    ))
+
+
+def test_unchanged_prefix_is_not_revalidated_across_turns_with_image_tail(client):
+    image_store = {}
+    history = [{"role": "user", "content": "打开浏览器"}, *_screenshot_turn(image_store)]
+    _turn(client, history, image_store)
+
+    # 已验证的消息即使之后变为无效也不会再被检查，说明第二轮只验证了新增的消息
+    history[0]["role"] = "invalid"
+    history.extend(_screenshot_turn(image_store))
+    _turn(client, history, image_store)
+
+
+def test_invalid_message_appended_later_is_rejected(client):
+    image_store = {}
+    history = [{"role": "user", "content": "打开浏览器"}, *_screenshot_turn(image_store)]
+    _turn(client, history, image_store)
+
+    history.extend(_screenshot_turn(image_store))
+    history[-2]["role"] = "invalid"
+    with pytest.raises(ValueError, match="无效的消息角色"):
+        _turn(client, history, image_store)
+
+
+def test_replaced_history_is_validated_again(client):
+    image_store = {}
+    history = [{"role": "user", "content": "打开浏览器"}, *_screenshot_turn(image_store)]
+    _turn(client, history, image_store)
+
+    # 新的历史对象不与已验证的前缀相同，需要完整验证
+    replaced = [{"role": "invalid", "content": "a"}, *_screenshot_turn(image_store)]
+    with pytest.raises(ValueError, match="无效的消息角色"):
+        _turn(client, replaced, image_store)
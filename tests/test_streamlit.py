@@ -0,0 +1,26 @@
+"""Streamlit界面中历史窗口计算的测试"""
+
+import pytest
+
+pytest.importorskip("streamlit")
+
+from computer_use_demo.streamlit import HistoryMsg, _history_window  # noqa: E402
+
+
+def _history(*roles):
+    return [HistoryMsg(role=role, content="") for role in roles]
+
+
+def test_history_window_counts_only_user_inputs_as_turns():
+    # 紧跟工具消息的用户消息是工具结果，不算新的一轮
+    messages = _history("user", "assistant", "user", "assistant", "tool", "user", "assistant")
+
+    assert _history_window(messages, 1) == 2
+    assert _history_window(messages, 2) == 0
+
+
+def test_history_window_keeps_everything_when_unlimited_or_short():
+    messages = _history("user", "assistant", "user", "assistant")
+
+    assert _history_window(messages, 0) == 0
+    assert _history_window(messages, 5) == 0